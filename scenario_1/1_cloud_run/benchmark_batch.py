@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+from fastmcp import Client
+from fastmcp.client.transports import StreamableHttpTransport
+
+# Measures the end-to-end latency of fetching several snippets with one get_code_snippet call per type, sequentially
+# (as the agent does) and concurrently, against a single batched get_code_snippets call. By default the MCP server is
+# started as a local process; pass --url to measure a deployed server instead, e.g. through the Cloud Run proxy.
+# run: uv run python benchmark_batch.py
+# run: uv run python benchmark_batch.py --url http://localhost:8080/mcp
+SERVER_PORT = 8081
+
+def start_server(port: int) -> subprocess.Popen:
+    env = {**os.environ, "PORT": str(port)}
+    src = os.path.join(os.path.dirname(__file__), "src")
+    process = subprocess.Popen([sys.executable, "main.py"], cwd=src, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while True:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/mcp")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+async def sequential(client: Client, types: list[str]):
+    for type in types:
+        await client.call_tool("get_code_snippet", {"type": type})
+
+async def concurrent(client: Client, types: list[str]):
+    await asyncio.gather(*(client.call_tool("get_code_snippet", {"type": type}) for type in types))
+
+async def batched(client: Client, types: list[str]):
+    await client.call_tool("get_code_snippets", {"types": types})
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+async def benchmark(url: str, types: list[str], iterations: int):
+    async with Client(StreamableHttpTransport(url)) as client:
+        print(f"{'path':<36} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for name, fn in (
+            (f"{len(types)} x get_code_snippet (sequential)", sequential),
+            (f"{len(types)} x get_code_snippet (concurrent)", concurrent),
+            ("1 x get_code_snippets", batched),
+        ):
+            for _ in range(5):
+                await fn(client, types)
+
+            latencies = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                await fn(client, types)
+                latencies.append(time.perf_counter() - start)
+
+            p50, p95 = percentile(latencies, 50), percentile(latencies, 95)
+            print(f"{name:<36} {p50 * 1e3:>8.2f} {p95 * 1e3:>8.2f} {max(latencies) * 1e3:>8.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare batched and per-type snippet tool calls.")
+    parser.add_argument("--url", help="MCP endpoint to measure. Starts a local server if not given.")
+    parser.add_argument("--types", default="sql,python,go", help="Comma-separated snippet types to fetch.")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    server = None if args.url else start_server(SERVER_PORT)
+    try:
+        asyncio.run(benchmark(args.url or f"http://127.0.0.1:{SERVER_PORT}/mcp", args.types.split(","), args.iterations))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
@@ -0,0 +1,75 @@
+import os
+import sys
+import timeit
+import argparse
+import textwrap
+
+from mcp.types import CallToolResult, JSONRPCResponse, TextContent
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+from http_middleware import ENCODERS, SUPPORTED_ENCODINGS  # noqa: E402
+
+# Measures what the CompressionMiddleware's encoders cost and save on a get_code_snippet response, for snippets of
+# several sizes: the time to compress the body and its compressed size, sent as one JSON body and as an event stream
+# that is flushed after each event. Snippets are cut from this repository's own Python code. The smallest sizes show
+# where compressing stops paying off, which RESPONSE_COMPRESSION_MIN_BYTES is set from.
+# run: uv run python benchmark_compression.py
+# run: uv run python benchmark_compression.py --sizes 256,512,1024,4096,16384
+
+def make_snippet(size: int) -> str:
+    root = os.path.join(os.path.dirname(__file__), "..", "..")
+    paths = sorted(os.path.join(directory, name) for directory, _, names in os.walk(root) for name in names if name.endswith(".py"))
+    source = ""
+    for path in paths:
+        with open(path) as f:
+            source += f.read()
+        if len(source) >= size:
+            break
+    return f"```python\n{source[:size].rsplit(chr(10), 1)[0]}\n```"
+
+def response_body(snippet: str) -> bytes:
+    # The JSON-RPC response to a get_code_snippet call, serialized as the MCP server does.
+    result = CallToolResult(content=[TextContent(type="text", text=snippet)], structuredContent={"result": snippet})
+    response = JSONRPCResponse(jsonrpc="2.0", id=1, result=result.model_dump(by_alias=True, exclude_none=True))
+    return response.model_dump_json(by_alias=True, exclude_none=True).encode("utf-8")
+
+def sse(body: bytes) -> bytes:
+    # The same response as an event stream, as the MCP server sends it without MCP_JSON_RESPONSE.
+    return b"event: message\r\ndata: " + body + b"\r\n\r\n"
+
+def compress(encoding: str, body: bytes) -> bytes:
+    return ENCODERS[encoding]().encode(body, final=True)
+
+def compress_stream(encoding: str, body: bytes) -> bytes:
+    # The event flushed on its own, then the empty chunk that ends the stream.
+    encoder = ENCODERS[encoding]()
+    return encoder.encode(sse(body), final=False) + encoder.encode(b"", final=True)
+
+def measure(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cost and savings of compressing snippet responses.")
+    parser.add_argument("--sizes", default="256,512,1024,4096,16384", help="Comma-separated snippet sizes in bytes.")
+    parser.add_argument("--number", type=int, default=200, help="Compressions per timing.")
+    args = parser.parse_args()
+
+    if "zstd" not in SUPPORTED_ENCODINGS:
+        print("zstd needs Python 3.14 or later; measuring gzip only.\n")
+
+    print(f"{'snippet':>8} {'body':>7} {'encoding':>8} {'JSON µs':>8} {'JSON B':>7} {'SSE µs':>7} {'SSE B':>6}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        snippet = make_snippet(size)
+        body = response_body(snippet)
+        for encoding in SUPPORTED_ENCODINGS:
+            json_body = compress(encoding, body)
+            stream_body = compress_stream(encoding, body)
+            json_us = measure(lambda: compress(encoding, body), args.number)
+            stream_us = measure(lambda: compress_stream(encoding, body), args.number)
+            print(
+                f"{len(snippet):>8} {len(body):>7} {encoding:>8} {json_us:>8.1f} {len(json_body):>7} "
+                f"{stream_us:>7.1f} {len(stream_body):>6}"
+            )
+    print(textwrap.dedent("""
+        body: the uncompressed JSON-RPC response. JSON: the body compressed whole. SSE: the body as one event, flushed,
+        then the end of the stream."""))
@@ -0,0 +1,127 @@
+import json
+import time
+import argparse
+import statistics
+
+import httpx
+
+from benchmark_workers import start_server, stop_server
+
+# Compares the server's streamable HTTP modes: stateful or stateless (MCP_STATELESS_HTTP), each answering with SSE
+# or plain JSON (MCP_JSON_RESPONSE). Each mode runs in its own single-worker server process. For each it measures
+# - the cost of starting a session: the initialize request and the initialized notification.
+# - the latency of a tool call on an open session and the size of its response body.
+# - the server's resident memory per open session, after --sessions sessions were started and left open.
+# Requests are sent one at a time over a single keep-alive connection, so the figures are the server's own overhead.
+# run: uv run python benchmark_http_modes.py
+# run: uv run python benchmark_http_modes.py --calls 2000 --sessions 2000
+SERVER_PORT = 8082
+
+MODES = {
+    "stateful, SSE": {"MCP_STATELESS_HTTP": "false", "MCP_JSON_RESPONSE": "false"},
+    "stateful, JSON": {"MCP_STATELESS_HTTP": "false", "MCP_JSON_RESPONSE": "true"},
+    "stateless, SSE": {"MCP_STATELESS_HTTP": "true", "MCP_JSON_RESPONSE": "false"},
+    "stateless, JSON": {"MCP_STATELESS_HTTP": "true", "MCP_JSON_RESPONSE": "true"},
+}
+
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 0,
+    "method": "initialize",
+    "params": {"protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "benchmark", "version": "1"}},
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
+def tool_call(request_id: int) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": "get_code_snippet", "arguments": {"type": "sql"}},
+    }
+
+def read_result(response: httpx.Response) -> dict:
+    # A JSON response is the JSON-RPC message itself; an SSE response carries it in a "data:" line.
+    response.raise_for_status()
+    if response.headers["content-type"].startswith("application/json"):
+        return response.json()
+    for line in response.text.splitlines():
+        if line.startswith("data:"):
+            return json.loads(line[len("data:"):])
+    raise ValueError(f"No message in response: {response.text!r}")
+
+def open_session(client: httpx.Client, url: str) -> dict[str, str]:
+    """
+    Initializes an MCP session and returns the headers to send with its requests. A stateless server returns no
+    session id.
+    """
+    response = client.post(url, headers=HEADERS, json=INITIALIZE)
+    read_result(response)
+    headers = {**HEADERS, "mcp-protocol-version": INITIALIZE["params"]["protocolVersion"]}
+    if "mcp-session-id" in response.headers:
+        headers["mcp-session-id"] = response.headers["mcp-session-id"]
+    client.post(url, headers=headers, json=INITIALIZED).raise_for_status()
+    return headers
+
+def rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    raise ValueError(f"No VmRSS for process {pid}")
+
+def measure(url: str, pid: int, calls: int, sessions: int) -> dict:
+    with httpx.Client(timeout=30) as client:
+        # Warm up the server (the first request computes the tools version) and the connection.
+        headers = open_session(client, url)
+        read_result(client.post(url, headers=headers, json=tool_call(1)))
+
+        setup = []
+        for _ in range(min(calls, sessions)):
+            start = time.perf_counter()
+            open_session(client, url)
+            setup.append(time.perf_counter() - start)
+
+        latencies, sizes = [], []
+        for i in range(calls):
+            start = time.perf_counter()
+            response = client.post(url, headers=headers, json=tool_call(i + 2))
+            read_result(response)
+            latencies.append(time.perf_counter() - start)
+            sizes.append(len(response.content))
+
+        rss_before = rss_kib(pid)
+        for _ in range(sessions):
+            open_session(client, url)
+        time.sleep(1)
+        rss_after = rss_kib(pid)
+
+    return {
+        "session_setup_ms": statistics.median(setup) * 1e3,
+        "call_p50_ms": statistics.median(latencies) * 1e3,
+        "call_mean_ms": statistics.fmean(latencies) * 1e3,
+        "response_bytes": statistics.median(sizes),
+        "rss_mib": rss_after / 1024,
+        "kib_per_session": (rss_after - rss_before) / sessions,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the MCP server's stateful and stateless HTTP modes.")
+    parser.add_argument("--calls", type=int, default=500, help="Sequential tool calls to time in each mode.")
+    parser.add_argument("--sessions", type=int, default=500, help="Sessions to open when measuring memory.")
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{SERVER_PORT}/mcp"
+    print(f"{'mode':<16} {'setup ms':>9} {'call p50 ms':>12} {'call mean ms':>13} {'bytes':>6} {'RSS MiB':>8} {'KiB/session':>12}")
+    for mode, env in MODES.items():
+        server = start_server(SERVER_PORT, 1, env=env)
+        try:
+            row = measure(url, server.pid, args.calls, args.sessions)
+        finally:
+            stop_server(server)
+        print(
+            f"{mode:<16} {row['session_setup_ms']:>9.2f} {row['call_p50_ms']:>12.2f} {row['call_mean_ms']:>13.2f} "
+            f"{row['response_bytes']:>6.0f} {row['rss_mib']:>8.1f} {row['kib_per_session']:>12.2f}"
+        )
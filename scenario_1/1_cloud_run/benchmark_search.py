@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import random
+import resource
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+from snippet_search import POSTINGS_DEPTH, SnippetSearchIndex  # noqa: E402
+
+# Measures the search index used by search_code_snippets on a synthetic corpus: how long it takes to build, how much
+# memory it takes, and the latency distribution of queries against it.
+# run: uv run python benchmark_search.py --snippets 100000
+# run: uv run python benchmark_search.py --snippets 100000 --postings-depth 0
+
+TYPES = ["sql", "python", "javascript", "json", "go"]
+WORDS = [
+    "order", "customer", "product", "invoice", "payment", "user", "account", "session", "token", "request",
+    "response", "fetch", "parse", "filter", "sort", "merge", "join", "select", "insert", "update", "delete", "cache",
+    "retry", "timeout", "stream", "buffer", "queue", "worker", "event", "handler", "error", "logger", "config",
+    "date", "price", "quantity", "even", "number", "list", "slice", "map", "array", "string", "json", "http", "api",
+]
+
+def synthetic_snippets(count: int, rng: random.Random):
+    # Zipf-like word frequencies with a few rare identifiers per snippet, roughly like real source code.
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    for i in range(count):
+        words = rng.choices(WORDS, weights=weights, k=rng.randint(20, 120))
+        identifiers = [f"{rng.choice(WORDS)}{rng.choice(WORDS).title()}{i % 997}" for _ in range(3)]
+        yield TYPES[i % len(TYPES)], str(i), " ".join(words + identifiers)
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the snippet search index.")
+    parser.add_argument("--snippets", type=int, default=100_000, help="Number of synthetic snippets to index.")
+    parser.add_argument("--queries", type=int, default=2_000, help="Number of queries to time.")
+    parser.add_argument(
+        "--postings-depth", type=int, default=POSTINGS_DEPTH, help="Postings kept per term; 0 keeps them all."
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    snippets = list(synthetic_snippets(args.snippets, rng))
+
+    # Peak resident memory grown while building the index (ru_maxrss is in KiB on Linux).
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    index = SnippetSearchIndex(snippets, args.postings_depth)
+    build_seconds = time.perf_counter() - start
+    memory = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+
+    print(f"snippets             {args.snippets:>10}")
+    print(f"postings depth       {args.postings_depth or 'all':>10}")
+    print(f"terms                {len(index.postings):>10}")
+    print(f"build                {build_seconds:>10.2f} s")
+    print(f"build peak memory    {memory / 2**20:>10.1f} MiB")
+
+    queries = []
+    for _ in range(args.queries):
+        query = " ".join(rng.sample(WORDS, rng.randint(1, 4)))
+        queries.append((query, rng.choice([None, *TYPES])))
+
+    latencies = []
+    for query, type in queries:
+        start = time.perf_counter()
+        index.search(query, type, limit=5)
+        latencies.append(time.perf_counter() - start)
+
+    for p in (50, 95, 99):
+        print(f"query p{p:<13} {percentile(latencies, p) * 1e3:>10.3f} ms")
+    print(f"query max            {max(latencies) * 1e3:>10.3f} ms")
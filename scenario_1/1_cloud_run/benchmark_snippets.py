@@ -0,0 +1,49 @@
+import os
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+from main import SAMPLE_DATA  # noqa: E402
+from snippet_registry import SnippetRegistry  # noqa: E402
+
+# Measures the per-call cost of looking up a snippet: the original linear scan that re-renders the markdown on every
+# call, against the prebuilt registry used by get_code_snippet.
+# run: uv run python benchmark_snippets.py
+
+def linear_lookup(type: str) -> str:
+    matching_samples = [s for s in SAMPLE_DATA if s["type"].lower() == type.lower()]
+
+    if not matching_samples:
+        available_types = ", ".join(sorted({s["type"] for s in SAMPLE_DATA}))
+        return f"No sample data found for type: {type}. Available types: {available_types}"
+
+    sample = matching_samples[0]
+    return f"```{sample['type']}\n{sample['snippet'].strip()}\n```"
+
+def registry_lookup(registry: SnippetRegistry, type: str) -> str:
+    snippet = registry.get(type)
+    if snippet is None:
+        return f"No sample data found for type: {type}. Available types: {registry.available_types}"
+    return snippet
+
+def measure(name: str, fn, number: int):
+    seconds = min(timeit.repeat(fn, number=number, repeat=5))
+    print(f"{name:<28} {seconds / number * 1e9:>10.1f} ns/call")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark snippet lookups.")
+    parser.add_argument("--number", type=int, default=200_000, help="Calls per timing run.")
+    args = parser.parse_args()
+
+    registry = SnippetRegistry(SAMPLE_DATA)
+    # Both implementations must return identical responses.
+    for type in ("sql", "Python", "go", "rust"):
+        assert linear_lookup(type) == registry_lookup(registry, type), type
+
+    build_seconds = min(timeit.repeat(lambda: SnippetRegistry(SAMPLE_DATA), number=1000, repeat=5)) / 1000
+    print(f"registry build               {build_seconds * 1e6:>10.1f} us")
+
+    for type in ("go", "Python", "rust"):
+        measure(f"linear scan ({type})", lambda: linear_lookup(type), args.number)
+        measure(f"registry ({type})", lambda: registry_lookup(registry, type), args.number)
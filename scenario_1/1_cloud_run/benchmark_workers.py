@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+
+from test_mcp_client import DEFAULT_MIXES, LoadTest
+
+# Measures the server's throughput and latency with 1, 2 and 4 worker processes. Each run starts shared/serve.py with WORKERS
+# set, serving statelessly as several workers require, and, when the machine has enough CPUs, pins the server to as many CPUs as it has workers (standing in for a Cloud
+# Run instance with that many vCPUs) and the load generator to the remaining ones. The load generator drives the server
+# with the default scenario 1 tool mix as fast as --clients concurrent sessions allow.
+# run: uv run python benchmark_workers.py
+# run: uv run python benchmark_workers.py --workers 1,2,4 --clients 64 --duration 30
+SERVER_PORT = 8081
+
+def start_server(port: int, workers: int, cpus: set[int] | None = None, env: dict[str, str] | None = None) -> subprocess.Popen:
+    env = {**os.environ, "MCP_STATELESS_HTTP": "true", **(env or {}), "PORT": str(port), "WORKERS": str(workers)}
+    src = os.path.join(os.path.dirname(__file__), "src")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "shared.serve"],
+        cwd=src,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        preexec_fn=(lambda: os.sched_setaffinity(0, cpus)) if cpus else None,
+    )
+    while True:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/mcp")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    process.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the MCP server's throughput with different worker counts.")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to measure.")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent MCP sessions.")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to measure each worker count for.")
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.workers.split(",")]
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    # The server gets the first N CPUs and the load generator the rest, as long as at least one is left for it.
+    pin = len(cpus) > max(counts)
+    if pin:
+        os.sched_setaffinity(0, cpus[max(counts):])
+    else:
+        print(f"Only {len(cpus) or 'an unknown number of'} CPUs available; server and load generator share them.\n")
+
+    print(f"{'workers':>7} {'cpus':>5} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for count in counts:
+        server = start_server(SERVER_PORT, count, set(cpus[:count]) if pin else None)
+        try:
+            load_test = LoadTest(f"http://127.0.0.1:{SERVER_PORT}/mcp", args.clients, None, args.duration, DEFAULT_MIXES["1"], 0)
+            total = asyncio.run(load_test.run())["total"]
+        finally:
+            stop_server(server)
+        print(
+            f"{count:>7} {count if pin else '-':>5} {total['throughput_rps']:>9.1f} {total['p50_ms']:>8.2f} "
+            f"{total['p95_ms']:>8.2f} {total['p99_ms']:>8.2f} {total['errors']:>7}"
+        )
@@ -0,0 +1,168 @@
+import json
+import zlib
+import hashlib
+import functools
+
+from fastmcp import FastMCP
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    # zstd is in the standard library from Python 3.14.
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+# Response header carrying a hash of the server's tool definitions. Clients that cache the result of tools/list can
+# compare it with the value they listed under and list again only when it changes, i.e. after a deploy that changed
+# a tool.
+TOOLS_VERSION_HEADER = "mcp-tools-version"
+
+
+async def tools_version(server: FastMCP) -> str:
+    """
+    Returns a short hash of the name, description and schemas of every tool the server exposes.
+    """
+    tools = await server.get_tools()
+    definitions = [tools[name].to_mcp_tool().model_dump(mode="json") for name in sorted(tools)]
+    return hashlib.sha256(json.dumps(definitions, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class ToolsVersionMiddleware:
+    """
+    ASGI middleware that adds the TOOLS_VERSION_HEADER to every HTTP response. The version is computed on the first
+    request, once every tool has been registered.
+    """
+    def __init__(self, app: ASGIApp, server: FastMCP):
+        self.app = app
+        self.server = server
+        self._version: bytes | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._version is None:
+            self._version = (await tools_version(self.server)).encode("ascii")
+
+        async def send_with_version(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (TOOLS_VERSION_HEADER.encode("ascii"), self._version)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_version)
+
+
+# Content codings the server can compress responses with, most preferred first.
+SUPPORTED_ENCODINGS = ("zstd", "gzip") if zstd else ("gzip",)
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+@functools.lru_cache(maxsize=64)
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """
+    Returns the supported content coding a request's Accept-Encoding header prefers, honoring q-values and `*`, or
+    None if it accepts none of them. On a tie the server's preference, SUPPORTED_ENCODINGS, decides.
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[name.strip()] = q
+
+    # An encoding that isn't named gets the quality of `*`, if given.
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = qualities.get(encoding, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _GzipEncoder:
+    # A single gzip member. A chunk that isn't the last ends in a sync flush, so the client can decode it on arrival.
+    def __init__(self):
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def encode(self, data: bytes, final: bool) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _ZstdEncoder:
+    # A single zstd frame. A chunk that isn't the last ends a block, so the client can decode it on arrival.
+    def __init__(self):
+        self.compressor = zstd.ZstdCompressor(level=ZSTD_LEVEL)
+
+    def encode(self, data: bytes, final: bool) -> bytes:
+        mode = zstd.ZstdCompressor.FLUSH_FRAME if final else zstd.ZstdCompressor.FLUSH_BLOCK
+        return self.compressor.compress(data, mode=mode)
+
+
+ENCODERS = {"gzip": _GzipEncoder, "zstd": _ZstdEncoder}
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses responses to MCP messages (POST requests) with the content coding the client
+    prefers, zstd or gzip. Bodies smaller than `min_size` bytes are sent as they are.
+
+    A JSON response is compressed whole. An event stream is compressed as it is sent, each chunk flushed so its
+    events reach the client without delay; whether it is compressed at all is decided by the size of its first chunk.
+    """
+    def __init__(self, app: ASGIApp, min_size: int = 512):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # The response start is held back until the first body chunk shows whether to compress.
+        start: Message | None = None
+        encoder: _GzipEncoder | _ZstdEncoder | None = None
+
+        async def send_compressed(message: Message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=list(start.get("headers", [])))
+                if len(body) >= self.min_size and "content-encoding" not in headers:
+                    encoder = ENCODERS[encoding]()
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    del headers["Content-Length"]
+                    body = encoder.encode(body, final=not more_body)
+                    if not more_body:
+                        headers["Content-Length"] = str(len(body))
+                    start["headers"] = headers.raw
+                    message = {"type": "http.response.body", "body": body, "more_body": more_body}
+                await send(start)
+                start = None
+            elif encoder is not None:
+                message = {"type": "http.response.body", "body": encoder.encode(body, final=not more_body), "more_body": more_body}
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -1,9 +1,19 @@
-import asyncio
 import logging
 import os
 import textwrap
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence
+from urllib.parse import parse_qs, urlsplit
 from fastmcp import FastMCP
+from fastmcp.exceptions import ResourceError
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from starlette.middleware import Middleware as ASGIMiddleware
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+
+from snippet_registry import SnippetRegistry, content_hash, normalize_type
+from snippet_corpus import SnippetCorpus
+from snippet_search import POSTINGS_DEPTH, SnippetSearch
+from http_middleware import CompressionMiddleware, ToolsVersionMiddleware
+from shared.serve import APP, MCP_JSON_RESPONSE, serve, stateless_http, worker_count
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(format="[%(levelname)s]: %(message)s", level=logging.INFO)
@@ -185,13 +195,35 @@ SAMPLE_DATA = [
     }
 ]
 
+# Snippets are rendered to markdown once at startup so each tool call is a single dictionary lookup. If
+# SNIPPET_CORPUS_PATH points at a corpus built with `python snippet_corpus.py <source_dir> <output_path>`, snippets
+# are served from that memory-mapped file instead and reloaded whenever the file is replaced.
+SNIPPET_CORPUS_PATH = os.getenv("SNIPPET_CORPUS_PATH")
+SNIPPET_CORPUS_RELOAD_SECONDS = float(os.getenv("SNIPPET_CORPUS_RELOAD_SECONDS", 1))
+
+if SNIPPET_CORPUS_PATH:
+    snippet_registry = SnippetCorpus(SNIPPET_CORPUS_PATH, reload_interval=SNIPPET_CORPUS_RELOAD_SECONDS)
+else:
+    snippet_registry = SnippetRegistry(SAMPLE_DATA)
+
+# Full-text index over every snippet, built at startup and rebuilt in the background after the corpus file is reloaded.
+# Each term keeps only its SEARCH_POSTINGS_DEPTH best matches, which bounds query time on large corpora but can miss
+# weaker matches for common terms; 0 keeps them all and makes results exact.
+SEARCH_POSTINGS_DEPTH = int(os.getenv("SEARCH_POSTINGS_DEPTH", POSTINGS_DEPTH))
+snippet_search = SnippetSearch(snippet_registry, postings_depth=SEARCH_POSTINGS_DEPTH)
+SEARCH_MAX_RESULTS = 20
+
+# Upper bound on the number of types a single get_code_snippets call can request.
+BATCH_MAX_TYPES = 20
+
 @mcp.tool()
 def get_code_snippet(type: str) -> str:
     """
     Retrieves sample code snippets by type formatted as markdown.
 
     Args:
-        type: The type of code snippet to retrieve (sql, python, javascript, json, or go).
+        type: The type of code snippet to retrieve (sql, python, javascript, json, or go). The aliases py, js,
+            golang and postgres are also accepted.
 
     Returns:
         A markdown-formatted string containing the code snippet with proper syntax highlighting.
@@ -199,25 +231,140 @@ def get_code_snippet(type: str) -> str:
     """
     logger.info(f">>> 🛠️ Tool: 'get_code_snippet' called for '{type}'")
 
-    matching_samples = [s for s in SAMPLE_DATA if s["type"].lower() == type.lower()]
+    snippet = snippet_registry.get(type)
+    if snippet is None:
+        return f"No sample data found for type: {type}. Available types: {snippet_registry.available_types}"
+
+    return snippet
+
+@mcp.tool()
+def get_code_snippets(types: List[str]) -> str:
+    """
+    Retrieves sample code snippets for several types in one call, formatted as markdown.
+
+    Prefer this over calling get_code_snippet repeatedly when more than one type is needed.
+
+    Args:
+        types: The types of code snippets to retrieve (sql, python, javascript, json, or go). The aliases py, js,
+            golang and postgres are also accepted. At most 20 types can be requested at once.
+
+    Returns:
+        A markdown-formatted string with a section per requested type, in the order requested. A type that is not
+        found gets an error message in its section instead of a snippet; the other types are still returned.
+    """
+    logger.info(f">>> 🛠️ Tool: 'get_code_snippets' called for {types}")
+
+    if not types:
+        return f"No types requested. Available types: {snippet_registry.available_types}"
+    if len(types) > BATCH_MAX_TYPES:
+        return f"Too many types requested ({len(types)}), the maximum is {BATCH_MAX_TYPES}."
+
+    sections = []
+    # Each type is returned once, however many times it or its aliases were requested.
+    for type in dict.fromkeys(normalize_type(type) for type in types):
+        snippet = snippet_registry.get(type)
+        if snippet is None:
+            snippet = f"❌ No sample data found for type: {type}. Available types: {snippet_registry.available_types}"
+        sections.append(f"### {type}\n\n{snippet}")
+    return "\n\n".join(sections)
+
+# Every snippet is also published as a resource, e.g. snippet://sql/0 or, for a corpus, snippet://python/utils/retry.
+# Each read carries the snippet's ETag in the contents' _meta. A client revalidating a cached snippet passes it back
+# as snippet://sql/0?if_none_match=<etag> and gets an empty body marked notModified if the snippet is unchanged.
+SNIPPET_URI_SCHEME = "snippet"
+
+@mcp.resource(
+    f"{SNIPPET_URI_SCHEME}://{{type}}/{{id*}}{{?if_none_match}}",
+    name="code_snippet",
+    description="A code snippet by type and id, formatted as markdown.",
+    mime_type="text/markdown",
+)
+def read_code_snippet(type: str, id: str, if_none_match: str | None = None) -> str:
+    snippet = snippet_registry.get_by_id(type, id)
+    if snippet is None:
+        raise ResourceError(f"No snippet found for type: {type} and id: {id}")
+
+    if if_none_match is not None and if_none_match == content_hash(snippet):
+        return ""
+    return snippet
+
+class SnippetETagMiddleware(Middleware):
+    """
+    Adds the ETag of the returned snippet to every snippet resource read, or marks the response notModified when
+    read_code_snippet answered a matching if_none_match with an empty body.
+    """
+    async def on_read_resource(
+        self,
+        context: MiddlewareContext,
+        call_next,
+    ) -> Sequence[ReadResourceContents]:
+        contents = await call_next(context)
+
+        uri = urlsplit(str(context.message.uri))
+        if uri.scheme != SNIPPET_URI_SCHEME:
+            return contents
+
+        if_none_match = parse_qs(uri.query).get("if_none_match", [None])[0]
+        tagged = []
+        for item in contents:
+            if item.content == "" and if_none_match is not None:
+                meta = {"etag": if_none_match, "notModified": True}
+            else:
+                meta = {"etag": content_hash(item.content)}
+            tagged.append(ReadResourceContents(content=item.content, mime_type=item.mime_type, meta=meta))
+        return tagged
+
+mcp.add_middleware(SnippetETagMiddleware())
+
+@mcp.tool()
+def search_code_snippets(query: str, type: str | None = None, limit: int = 5) -> str:
+    """
+    Searches the code snippets for the given words and returns the best matches formatted as markdown.
+
+    Args:
+        query: Words to search for, e.g. "join orders customers" or "fetch user api". Identifiers such as
+            findEvenNumbers or order_date also match their individual words.
+        type: Optionally, only search snippets of this type (sql, python, javascript, json, or go).
+        limit: The maximum number of snippets to return (at most 20).
+
+    Returns:
+        A markdown-formatted string with the matching snippets, best match first, or a message if nothing matched.
+    """
+    logger.info(f">>> 🛠️ Tool: 'search_code_snippets' called for '{query}' (type: {type}, limit: {limit})")
+
+    results = snippet_search.search(query, type, max(1, min(limit, SEARCH_MAX_RESULTS)))
+    if not results:
+        return f"No code snippets matched: {query}"
+
+    sections = []
+    for score, snippet_type, snippet_id in results:
+        snippet = snippet_registry.get_by_id(snippet_type, snippet_id)
+        if snippet is not None:
+            uri = f"{SNIPPET_URI_SCHEME}://{snippet_type}/{snippet_id}"
+            sections.append(f"**{snippet_type} / {snippet_id}** ({uri}, score {score:.2f})\n\n{snippet}")
+    return "\n\n".join(sections)
 
-    if not matching_samples:
-        available_types = ", ".join(sorted({s["type"] for s in SAMPLE_DATA}))
-        return f"No sample data found for type: {type}. Available types: {available_types}"
+# Responses of at least RESPONSE_COMPRESSION_MIN_BYTES are compressed with zstd or gzip, as the client accepts; smaller
+# ones aren't worth the CPU time. The default takes in a get_code_snippet response for any of the sample snippets.
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", 512))
 
-    sample = matching_samples[0]
-    code_type = sample["type"]
-    code_snippet = sample["snippet"].strip()
+compression_middleware = []
+if RESPONSE_COMPRESSION:
+    compression_middleware.append(ASGIMiddleware(CompressionMiddleware, min_size=RESPONSE_COMPRESSION_MIN_BYTES))
 
-    return f"```{code_type}\n{code_snippet}\n```"
+# The server as an ASGI app, served by shared/serve.py. MCP sessions live in the memory of the process that created them, so
+# running several worker processes (WORKERS) requires MCP_STATELESS_HTTP=true. Each worker builds its own snippet
+# registry, search index and caches.
+app = mcp.http_app(
+    transport="streamable-http",
+    middleware=[*compression_middleware, ASGIMiddleware(ToolsVersionMiddleware, server=mcp)],
+    stateless_http=stateless_http(),
+    json_response=MCP_JSON_RESPONSE,
+)
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8080))
     logger.info(f"🚀 MCP server started on port {port}")
-    asyncio.run(
-        mcp.run_async(
-            transport="streamable-http",
-            host="0.0.0.0",
-            port=port,
-        )
-    )
\ No newline at end of file
+    # This process has already built the app; with several workers each one builds its own from "main:app".
+    serve(app if worker_count() == 1 else APP, port)
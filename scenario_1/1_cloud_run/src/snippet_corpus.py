@@ -0,0 +1,219 @@
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Iterator
+
+from snippet_registry import TYPE_ALIASES, normalize_type
+
+logger = logging.getLogger(__name__)
+
+# A snippet corpus is a single file laid out as:
+#   header - magic bytes, then the offset and length of the index (little-endian u64s)
+#   blob   - the UTF-8 bodies of every snippet, concatenated
+#   index  - a JSON list of {"type", "id", "offset", "length"} entries locating each body in the blob
+# The server memory-maps the file and only holds the index in memory; bodies are sliced out when requested.
+MAGIC = b"SNIPPET1"
+HEADER = struct.Struct("<8sQQ")
+
+# Snippet type for each source file extension. Files with other extensions are skipped by the builder.
+EXTENSION_TYPES = {
+    ".sql": "sql",
+    ".py": "python",
+    ".js": "javascript",
+    ".json": "json",
+    ".go": "go",
+}
+
+
+def build_corpus(source_dir: str, output_path: str) -> int:
+    """
+    Compiles every recognized source file under `source_dir` into a corpus file and returns the number of snippets.
+
+    The corpus is written to a temporary file and atomically renamed over `output_path`, so a running server never
+    sees a partially written file. Each file's id is its path relative to `source_dir` without the extension.
+    """
+    source = Path(source_dir)
+    output = Path(output_path)
+    index = []
+
+    with tempfile.NamedTemporaryFile(dir=output.parent, prefix=f".{output.name}.", delete=False) as f:
+        f.write(HEADER.pack(MAGIC, 0, 0))
+        offset = HEADER.size
+
+        for path in sorted(p for p in source.rglob("*") if p.is_file()):
+            snippet_type = EXTENSION_TYPES.get(path.suffix.lower())
+            if snippet_type is None:
+                logger.info(f"Skipping {path}: unknown snippet type")
+                continue
+
+            body = path.read_text(encoding="utf-8").strip().encode("utf-8")
+            snippet_id = path.relative_to(source).with_suffix("").as_posix()
+            index.append({"type": snippet_type, "id": snippet_id, "offset": offset, "length": len(body)})
+            f.write(body)
+            offset += len(body)
+
+        index_bytes = json.dumps(index, separators=(",", ":")).encode("utf-8")
+        f.write(index_bytes)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, offset, len(index_bytes)))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(f.name, output)
+    return len(index)
+
+
+@dataclass(frozen=True)
+class _LoadedCorpus:
+    data: mmap.mmap
+    by_type: dict[str, tuple[tuple[str, str, int, int], ...]]
+    by_id: dict[tuple[str, str], tuple[int, int]]
+    types: tuple[str, ...]
+    available_types: str
+    file_key: tuple[int, int, int]
+
+
+def _load(path: str) -> _LoadedCorpus:
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, index_offset, index_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a snippet corpus")
+
+    by_type: dict[str, list[tuple[str, str, int, int]]] = {}
+    by_id: dict[tuple[str, str], tuple[int, int]] = {}
+    for entry in json.loads(data[index_offset:index_offset + index_length]):
+        by_type.setdefault(entry["type"], []).append((entry["type"], entry["id"], entry["offset"], entry["length"]))
+        by_id[(entry["type"], entry["id"])] = (entry["offset"], entry["length"])
+
+    types = tuple(sorted(by_type))
+    for alias, snippet_type in TYPE_ALIASES.items():
+        if snippet_type in by_type:
+            by_type.setdefault(alias, by_type[snippet_type])
+
+    return _LoadedCorpus(
+        data=data,
+        by_type={snippet_type: tuple(entries) for snippet_type, entries in by_type.items()},
+        by_id=by_id,
+        types=types,
+        available_types=", ".join(types),
+        file_key=(stat.st_ino, stat.st_mtime_ns, stat.st_size),
+    )
+
+
+class SnippetCorpus:
+    """
+    Snippets served from a memory-mapped corpus file built by `build_corpus`.
+
+    Offers the same lookups as SnippetRegistry. At most once every `reload_interval` seconds a lookup checks whether
+    the file was replaced and, if so, loads the new file and swaps it in as a whole; lookups already in progress keep
+    reading the corpus they started with.
+    """
+    def __init__(self, path: str, reload_interval: float = 1.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._corpus = _load(path)
+        self._checked_at = time.monotonic()
+        self._reload_lock = threading.Lock()
+
+        self.reloads = 0
+        logger.info(f"Loaded snippet corpus {path} with types: {self._corpus.available_types}")
+
+    @property
+    def version(self) -> int:
+        """
+        Incremented every time a new corpus file is loaded.
+        """
+        self._current()
+        return self.reloads
+
+    @property
+    def types(self) -> tuple[str, ...]:
+        return self._current().types
+
+    @property
+    def available_types(self) -> str:
+        return self._current().available_types
+
+    def get(self, type: str) -> str | None:
+        """
+        Returns the first snippet for a type or alias (case-insensitive) rendered as markdown, or None.
+        """
+        corpus = self._current()
+        entries = corpus.by_type.get(type) or corpus.by_type.get(type.strip().lower())
+        if not entries:
+            return None
+
+        snippet_type, _, offset, length = entries[0]
+        return f"```{snippet_type}\n{corpus.data[offset:offset + length].decode('utf-8')}\n```"
+
+    def get_by_id(self, type: str, id: str) -> str | None:
+        """
+        Returns the snippet with the given type and id rendered as markdown, or None.
+        """
+        corpus = self._current()
+        snippet_type = normalize_type(type)
+        location = corpus.by_id.get((snippet_type, id))
+        if location is None:
+            return None
+
+        offset, length = location
+        return f"```{snippet_type}\n{corpus.data[offset:offset + length].decode('utf-8')}\n```"
+
+    def snippets(self) -> Iterator[tuple[str, str, str]]:
+        """
+        Yields the type, id and body of every snippet in the current corpus.
+        """
+        corpus = self._corpus
+        for (snippet_type, snippet_id), (offset, length) in corpus.by_id.items():
+            yield snippet_type, snippet_id, corpus.data[offset:offset + length].decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._current().types)
+
+    def _current(self) -> _LoadedCorpus:
+        if time.monotonic() - self._checked_at >= self.reload_interval and self._reload_lock.acquire(blocking=False):
+            try:
+                self._checked_at = time.monotonic()
+                self._reload_if_changed()
+            finally:
+                self._reload_lock.release()
+        return self._corpus
+
+    def _reload_if_changed(self):
+        try:
+            stat = os.stat(self.path)
+            if (stat.st_ino, stat.st_mtime_ns, stat.st_size) == self._corpus.file_key:
+                return
+            self._corpus = _load(self.path)
+            self.reloads += 1
+            logger.info(f"Reloaded snippet corpus {self.path} with types: {self._corpus.available_types}")
+        except (OSError, ValueError) as e:
+            # Keep serving the corpus already loaded until a valid file appears.
+            logger.warning(f"Unable to reload snippet corpus {self.path}: {e}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="[%(levelname)s]: %(message)s", level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Compile a directory of source files into a snippet corpus.")
+    parser.add_argument("source_dir", help="Directory of source files (.sql, .py, .js, .json, .go).")
+    parser.add_argument("output_path", help="Corpus file to write, e.g. snippets.corpus.")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.source_dir):
+        sys.exit(f"Source directory not found: {args.source_dir}")
+
+    count = build_corpus(args.source_dir, args.output_path)
+    logger.info(f"✅ Wrote {count} snippets to {args.output_path}")
@@ -0,0 +1,88 @@
+import hashlib
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Tuple
+
+# Alternative names accepted for each snippet type.
+TYPE_ALIASES = {
+    "py": "python",
+    "js": "javascript",
+    "golang": "go",
+    "postgres": "sql",
+}
+
+
+def normalize_type(type: str) -> str:
+    """
+    Returns the canonical lowercase snippet type for a type or alias.
+    """
+    type = type.strip().lower()
+    return TYPE_ALIASES.get(type, type)
+
+
+def content_hash(content: str) -> str:
+    """
+    Returns a short hash of a rendered snippet that changes whenever its content does, used as its ETag.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+class SnippetRegistry:
+    """
+    An immutable lookup table of markdown-rendered code snippets keyed by type.
+
+    Every response is rendered once when the registry is built, so a lookup is a single dict hit that returns a
+    prebuilt string. `get` returns the first snippet of each type, matching the original `get_code_snippet`
+    behavior; every snippet is also addressable by its type and id, the snippet's position among those of its type.
+    """
+    # The registry never changes, unlike a corpus that can be reloaded.
+    version = 0
+
+    def __init__(self, samples: List[Dict[str, Any]], aliases: Mapping[str, str] = TYPE_ALIASES):
+        rendered: Dict[str, str] = {}
+        by_id: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        counts: Dict[str, int] = {}
+        for sample in samples:
+            code_type = sample["type"].lower()
+            body = sample["snippet"].strip()
+            markdown = f"```{sample['type']}\n{body}\n```"
+            rendered.setdefault(code_type, markdown)
+
+            snippet_id = str(counts.get(code_type, 0))
+            counts[code_type] = counts.get(code_type, 0) + 1
+            by_id[(code_type, snippet_id)] = (body, markdown)
+
+        for alias, code_type in aliases.items():
+            if code_type in rendered:
+                rendered.setdefault(alias, rendered[code_type])
+
+        self.types = tuple(sorted({sample["type"] for sample in samples}))
+        self.available_types = ", ".join(self.types)
+        self._rendered = MappingProxyType(rendered)
+        self._by_id = MappingProxyType(by_id)
+
+    def get(self, type: str) -> str | None:
+        """
+        Returns the rendered snippet for a type or alias (case-insensitive), or None if there is none.
+        """
+        # Exact matches (the common case) need no normalization.
+        rendered = self._rendered.get(type)
+        if rendered is None:
+            rendered = self._rendered.get(type.strip().lower())
+        return rendered
+
+    def get_by_id(self, type: str, id: str) -> str | None:
+        """
+        Returns the rendered snippet with the given type and id, or None if there is none.
+        """
+        snippet = self._by_id.get((normalize_type(type), id))
+        return snippet[1] if snippet else None
+
+    def snippets(self) -> Iterator[Tuple[str, str, str]]:
+        """
+        Yields the type, id and body of every snippet.
+        """
+        for (code_type, snippet_id), (body, _) in self._by_id.items():
+            yield code_type, snippet_id, body
+
+    def __len__(self) -> int:
+        return len(self.types)
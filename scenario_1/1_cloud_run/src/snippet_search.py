@@ -0,0 +1,181 @@
+import re
+import math
+import time
+import heapq
+import logging
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain, islice
+from operator import itemgetter
+from typing import Iterable, Protocol
+
+from snippet_registry import normalize_type
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters: k1 controls term frequency saturation, b how strongly scores are normalized by snippet length.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# By default only the POSTINGS_DEPTH highest-scoring postings of each term (across all types, and per type) are kept,
+# so a query does a bounded amount of work however common its terms are. Results are then approximate: a snippet
+# outside the kept postings of a query term gets no score for it, and one outside them for every query term is not
+# found at all. With 100k snippets, keeping every posting makes queries over 100 times slower (see
+# benchmark_search.py).
+POSTINGS_DEPTH = 256
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "code", "example", "for", "from", "how", "i", "in", "is", "it",
+    "me", "of", "on", "or", "sample", "show", "snippet", "that", "the", "this", "to", "with",
+})
+
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+_IDENTIFIER_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+# Key under which each term's postings across all types are stored.
+ALL_TYPES = ""
+
+
+def _stem(term: str) -> str:
+    # A deliberately small stemmer so "filtering", "filters" and "filter" match each other.
+    for suffix in ("ing", "ed", "es", "s"):
+        if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+            return term[:-len(suffix)]
+    return term
+
+
+@lru_cache(maxsize=1 << 18)
+def _word_terms(word: str) -> tuple[str, ...]:
+    parts = [part.lower() for part in _IDENTIFIER_PART.findall(word)]
+    whole = word.lower()
+    terms = [whole] if len(parts) > 1 or (parts and parts[0] != whole) else []
+    terms.extend(parts)
+    return tuple(_stem(term) for term in terms if term not in STOPWORDS)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lowercase, stemmed search terms. Identifiers are indexed both whole and split into their
+    camelCase / snake_case parts, so `findEvenNumbers` matches a query for "even numbers".
+    """
+    return list(chain.from_iterable(map(_word_terms, _WORD.findall(text))))
+
+
+class SnippetSearchIndex:
+    """
+    An inverted index over snippet bodies and types, ranked with BM25.
+
+    Each posting's BM25 contribution is computed when the index is built. For every term the index keeps the
+    `postings_depth` best postings across all types and per type, best first, so a query only sums a bounded number
+    of precomputed scores and keeps the best `limit` results. A `postings_depth` of None or 0 keeps every posting and
+    makes results exact.
+    """
+    def __init__(self, snippets: Iterable[tuple[str, str, str]], postings_depth: int | None = POSTINGS_DEPTH):
+        depth = postings_depth or None
+        self.documents: list[tuple[str, str]] = []
+        # For each type, the (snippet, term frequency) pairs of every term, and each snippet's length in terms.
+        occurrences: dict[str, dict[str, list[tuple[int, int]]]] = {}
+        lengths: list[int] = []
+        for doc_id, (snippet_type, snippet_id, body) in enumerate(snippets):
+            # The type is indexed as a term too, so "go slice" favors Go snippets.
+            terms = Counter(tokenize(body))
+            terms[snippet_type] += 1
+            type_occurrences = occurrences.setdefault(snippet_type, defaultdict(list))
+            for term, tf in terms.items():
+                type_occurrences[term].append((doc_id, tf))
+            lengths.append(sum(terms.values()))
+            self.documents.append((snippet_type, snippet_id))
+
+        doc_count = len(lengths)
+        avg_length = sum(lengths) / doc_count if doc_count else 0
+        length_norms = [BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) for length in lengths]
+        doc_freq: Counter = Counter()
+        for type_occurrences in occurrences.values():
+            for term, entries in type_occurrences.items():
+                doc_freq[term] += len(entries)
+
+        postings: dict[str, dict[str, list[tuple[float, int]]]] = defaultdict(dict)
+        for snippet_type, type_occurrences in occurrences.items():
+            for term, entries in type_occurrences.items():
+                idf = math.log(1 + (doc_count - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                scored = [(idf * tf * (BM25_K1 + 1) / (tf + length_norms[doc_id]), doc_id) for doc_id, tf in entries]
+                scored.sort(reverse=True)
+                postings[term][snippet_type] = scored[:depth]
+
+        for by_type in postings.values():
+            if len(by_type) == 1:
+                by_type[ALL_TYPES] = next(iter(by_type.values()))
+            else:
+                by_type[ALL_TYPES] = list(islice(heapq.merge(*by_type.values(), reverse=True), depth))
+        self.postings = dict(postings)
+
+    def search(self, query: str, type: str | None = None, limit: int = 5) -> list[tuple[float, str, str]]:
+        """
+        Returns up to `limit` (score, type, id) results for the query, best first, optionally for one type only.
+        """
+        snippet_type = normalize_type(type) if type else ALL_TYPES
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            by_type = self.postings.get(term)
+            if by_type is None:
+                continue
+            for score, doc_id in by_type.get(snippet_type, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        best = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        return [(score, *self.documents[doc_id]) for doc_id, score in best]
+
+
+class SnippetSource(Protocol):
+    version: int
+
+    def snippets(self) -> Iterable[tuple[str, str, str]]: ...
+
+
+class SnippetSearch:
+    """
+    Keeps a SnippetSearchIndex in step with a snippet source.
+
+    When a search finds that the source's version changed (e.g. a corpus file was reloaded), a new index is built in
+    a background thread and swapped in once it is complete. Searches meanwhile keep using the previous index, so no
+    request waits for a rebuild; `rebuilds` counts the indexes swapped in.
+    """
+    def __init__(self, source: SnippetSource, postings_depth: int | None = POSTINGS_DEPTH):
+        self.source = source
+        self.postings_depth = postings_depth
+        self._lock = threading.Lock()
+        self._version = source.version
+        self._index = SnippetSearchIndex(source.snippets(), postings_depth)
+        self._builder: threading.Thread | None = None
+        self.rebuilds = 0
+
+    def search(self, query: str, type: str | None = None, limit: int = 5) -> list[tuple[float, str, str]]:
+        if self.source.version != self._version:
+            self._start_rebuild()
+        return self._index.search(query, type, limit)
+
+    def _start_rebuild(self):
+        with self._lock:
+            if self._builder is not None:
+                return
+            self._builder = threading.Thread(target=self._rebuild, name="snippet-search-rebuild", daemon=True)
+            self._builder.start()
+
+    def _rebuild(self):
+        try:
+            # The source may change again while an index is built; build until the index matches it.
+            while (version := self.source.version) != self._version:
+                start = time.perf_counter()
+                try:
+                    index = SnippetSearchIndex(self.source.snippets(), self.postings_depth)
+                except Exception:
+                    logger.exception("Unable to rebuild the snippet search index; keeping the previous one")
+                    self._version = version
+                    return
+                self._index, self._version = index, version
+                self.rebuilds += 1
+                logger.info(f"Rebuilt the snippet search index in {time.perf_counter() - start:.2f}s")
+        finally:
+            with self._lock:
+                self._builder = None
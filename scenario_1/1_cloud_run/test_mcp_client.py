@@ -1,21 +1,188 @@
+import re
+import sys
+import json
+import time
+import random
 import asyncio
+import argparse
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
 from fastmcp import Client
 from fastmcp.client.transports import StreamableHttpTransport
 from fastmcp.utilities.logging import configure_logging
 
-# Configure FastMCP to output DEBUG level logs
-configure_logging(level="DEBUG")
+# Smoke test and load generator for the MCP servers of scenario 1 and scenario 2.
+#
+# Without --clients it lists the server's tools and calls get_code_snippet twice, printing the results.
+# run: gcloud run services proxy code-snippet-mcp-server --region=us-central1
+# run: uv run python test_mcp_client.py
+#
+# With --clients it opens that many concurrent MCP sessions and calls a weighted mix of tools for --duration seconds,
+# either as fast as the sessions allow or at a total target --rate of calls per second. It reports throughput,
+# latency percentiles and errors per tool, as a table and as JSON. When a rate is set, latency is measured from the
+# time a call was due rather than when it was sent, so time spent waiting for a free session counts against the server.
+# run: uv run python test_mcp_client.py --clients 20 --duration 30
+# run: uv run python test_mcp_client.py --clients 20 --rate 200 --duration 30 --json results.json
+#
+# Scenario 2's server expects each caller's OAuth token; --bearer-tokens N gives the sessions N synthetic users with
+# tokens of the form ya29.load-test-user-<i>. Run its server locally against fake_google.py started with --accept-any-token.
+# run: uv run python test_mcp_client.py --scenario 2 --clients 20 --bearer-tokens 20 --duration 30
+DEFAULT_URL = "http://localhost:8080/mcp"
+
+@dataclass
+class MixEntry:
+    tool: str
+    args: dict
+    weight: float = 1
+
+    @property
+    def name(self) -> str:
+        return f"{self.tool}({','.join(f'{key}={value}' for key, value in self.args.items())})"
+
+# The tool mix used when --mix isn't given.
+DEFAULT_MIXES = {
+    "1": [
+        MixEntry("get_code_snippet", {"type": "sql"}, 3),
+        MixEntry("get_code_snippet", {"type": "python"}, 3),
+        MixEntry("get_code_snippets", {"types": ["sql", "json", "go"]}, 1),
+        MixEntry("search_code_snippets", {"query": "read a file"}, 2),
+    ],
+    "2": [
+        MixEntry("get_user_info_from_access_token", {"context": {"message": {}}}),
+    ],
+}
+
+def parse_mix(value: str) -> list[MixEntry]:
+    """
+    Reads a tool mix from a JSON list (or a file containing one) of {"tool": ..., "args": {...}, "weight": ...}.
+    """
+    text = open(value[1:]).read() if value.startswith("@") else value
+    return [MixEntry(entry["tool"], entry.get("args", {}), entry.get("weight", 1)) for entry in json.loads(text)]
+
+def error_kind(message: str, default: str) -> str:
+    # Errors that name a reason, e.g. scenario 2's admission rejections "(reason: rate_limited, ...)", are grouped by it.
+    match = re.search(r"reason: (\w+)", message)
+    return match.group(1) if match else default
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else 0.0
+
+class LoadTest:
+    def __init__(self, url: str, clients: int, rate: float | None, duration: float, mix: list[MixEntry], bearer_tokens: int):
+        self.url = url
+        self.clients = clients
+        self.rate = rate
+        self.duration = duration
+        self.mix = mix
+        self.bearer_tokens = bearer_tokens
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, Counter] = defaultdict(Counter)
+        self._next_slot = 0
+
+    def transport(self, index: int) -> StreamableHttpTransport:
+        headers = {}
+        if self.bearer_tokens:
+            headers["Authorization"] = f"Bearer ya29.load-test-user-{index % self.bearer_tokens}"
+        return StreamableHttpTransport(self.url, headers=headers)
+
+    async def run(self) -> dict:
+        # Sessions are opened (and MCP initialized) before the clock starts.
+        clients = [Client(self.transport(i)) for i in range(self.clients)]
+        opened = await asyncio.gather(*(client.__aenter__() for client in clients), return_exceptions=True)
+        failures = [result for result in opened if isinstance(result, Exception)]
+        if failures:
+            await asyncio.gather(*(client.__aexit__(None, None, None) for client in clients), return_exceptions=True)
+            raise SystemExit(f"Failed to open {len(failures)} of {self.clients} MCP sessions: {failures[0]}")
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(self.worker(client, start) for client in clients))
+            elapsed = time.perf_counter() - start
+        finally:
+            await asyncio.gather(*(client.__aexit__(None, None, None) for client in clients), return_exceptions=True)
+        return self.report(elapsed)
 
-async def test_server():
+    async def worker(self, client: Client, start: float):
+        weights = [entry.weight for entry in self.mix]
+        deadline = start + self.duration
+        while True:
+            if self.rate:
+                # Calls are due at fixed intervals; each worker takes the next due slot.
+                due = start + self._next_slot / self.rate
+                self._next_slot += 1
+                if due >= deadline:
+                    return
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            else:
+                due = time.perf_counter()
+                if due >= deadline:
+                    return
+
+            entry = random.choices(self.mix, weights)[0]
+            try:
+                result = await client.call_tool_mcp(entry.tool, entry.args)
+                if result.isError:
+                    message = " ".join(getattr(content, "text", "") for content in result.content)
+                    self.errors[entry.name][error_kind(message, "tool_error")] += 1
+                    continue
+            except Exception as e:
+                self.errors[entry.name][error_kind(str(e), type(e).__name__)] += 1
+                continue
+            self.latencies[entry.name].append(time.perf_counter() - due)
+
+    def report(self, elapsed: float) -> dict:
+        def summary(latencies: list[float], errors: Counter) -> dict:
+            return {
+                "requests": len(latencies) + sum(errors.values()),
+                "ok": len(latencies),
+                "errors": sum(errors.values()),
+                "throughput_rps": len(latencies) / elapsed,
+                "p50_ms": percentile(latencies, 50) * 1e3,
+                "p95_ms": percentile(latencies, 95) * 1e3,
+                "p99_ms": percentile(latencies, 99) * 1e3,
+                "max_ms": max(latencies, default=0.0) * 1e3,
+                "error_breakdown": dict(errors),
+            }
+
+        names = sorted(set(self.latencies) | set(self.errors))
+        total_errors = sum((self.errors[name] for name in names), Counter())
+        return {
+            "url": self.url,
+            "clients": self.clients,
+            "target_rate_rps": self.rate,
+            "duration_seconds": elapsed,
+            "bearer_tokens": self.bearer_tokens,
+            "tools": {name: summary(self.latencies[name], self.errors[name]) for name in names},
+            "total": summary([latency for name in names for latency in self.latencies[name]], total_errors),
+        }
+
+def print_table(report: dict):
+    print(f"{'tool':<52} {'requests':>8} {'errors':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, row in [*report["tools"].items(), ("total", report["total"])]:
+        print(
+            f"{name[:52]:<52} {row['requests']:>8} {row['errors']:>7} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.2f} "
+            f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.2f}"
+        )
+
+    errors = [(name, kind, count) for name, row in report["tools"].items() for kind, count in row["error_breakdown"].items()]
+    if errors:
+        print(f"\n{'tool':<52} {'error':<24} {'count':>7}")
+        for name, kind, count in errors:
+            print(f"{name[:52]:<52} {kind:<24} {count:>7}")
+
+async def test_server(url: str):
+
+    # Configure FastMCP to output DEBUG level logs
+    configure_logging(level="DEBUG")
 
     transport = StreamableHttpTransport(
-        "http://localhost:8080/mcp", 
+        url,
     )
 
     # Test the MCP server using streamable-http transport.
-    # run: gcloud run services proxy code-snippet-mcp-server --region=us-central1
     async with Client(transport) as client:
-       
+
         # 1. List available tools
         tools = await client.list_tools()
         for tool in tools:
@@ -42,4 +209,27 @@ async def test_server():
             print(f"<<< ❌ Error: {result.data}")
 
 if __name__ == "__main__":
-    asyncio.run(test_server())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Smoke test or load test an MCP server.")
+    parser.add_argument("--url", default=DEFAULT_URL, help="MCP endpoint of the server.")
+    parser.add_argument("--clients", type=int, help="Concurrent MCP sessions. Runs a load test when given.")
+    parser.add_argument("--rate", type=float, help="Target calls per second across all sessions. Unbounded if not given.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run the load test for.")
+    parser.add_argument("--scenario", choices=sorted(DEFAULT_MIXES), default="1", help="Server whose default tool mix to use.")
+    parser.add_argument("--mix", type=parse_mix, help='Tool mix as JSON, or @file: [{"tool": ..., "args": {...}, "weight": 1}]')
+    parser.add_argument("--bearer-tokens", type=int, default=0, help="Number of synthetic users to send bearer tokens for.")
+    parser.add_argument("--json", help="Write the JSON report to this file instead of printing it.")
+    args = parser.parse_args()
+
+    if not args.clients:
+        asyncio.run(test_server(args.url))
+        sys.exit()
+
+    load_test = LoadTest(args.url, args.clients, args.rate, args.duration, args.mix or DEFAULT_MIXES[args.scenario], args.bearer_tokens)
+    report = asyncio.run(load_test.run())
+    print_table(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print()
+        print(json.dumps(report, indent=2))
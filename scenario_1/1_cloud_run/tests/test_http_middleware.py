@@ -0,0 +1,136 @@
+import gzip
+import zlib
+
+import pytest
+
+from http_middleware import ENCODERS, SUPPORTED_ENCODINGS, CompressionMiddleware, negotiate_encoding, zstd
+
+pytestmark = pytest.mark.anyio
+
+ENCODINGS = [
+    "gzip",
+    pytest.param("zstd", marks=pytest.mark.skipif(zstd is None, reason="zstd needs Python 3.14 or later")),
+]
+
+SNIPPET = "```sql\n" + "SELECT name, email FROM users WHERE active = true ORDER BY name;\n" * 40 + "```"
+BODY = ('{"jsonrpc":"2.0","id":1,"result":{"content":[{"type":"text","text":"%s"}]}}' % SNIPPET.replace("\n", "\\n")).encode()
+EVENTS = [b"event: message\r\ndata: " + BODY + b"\r\n\r\n", b"event: message\r\ndata: {}\r\n\r\n", b""]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    return zstd.decompress(data) if encoding == "zstd" else gzip.decompress(data)
+
+
+def decompressor(encoding: str):
+    # Decodes a stream incrementally, as a client reading an event stream does.
+    if encoding == "zstd":
+        return zstd.ZstdDecompressor()
+    return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+def app(chunks: list[bytes], content_type: str = "application/json"):
+    async def asgi(scope, receive, send):
+        headers = [(b"content-type", content_type.encode())]
+        if len(chunks) == 1:
+            headers.append((b"content-length", str(len(chunks[0])).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return asgi
+
+
+async def call(middleware: CompressionMiddleware, accept_encoding: str, method: str = "POST") -> tuple[dict, list[bytes]]:
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    await middleware(scope, None, send)
+    start, *bodies = messages
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    return headers, [message["body"] for message in bodies]
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+async def test_json_response_round_trip(encoding):
+    headers, bodies = await call(CompressionMiddleware(app([BODY])), encoding)
+
+    assert headers["content-encoding"] == encoding
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(bodies[0]) < len(BODY)
+    assert decompress(encoding, bodies[0]) == BODY
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+async def test_event_stream_chunks_decode_on_arrival(encoding):
+    headers, bodies = await call(CompressionMiddleware(app(EVENTS, "text/event-stream")), encoding)
+
+    assert headers["content-encoding"] == encoding
+    assert "content-length" not in headers
+    assert len(bodies) == len(EVENTS)
+    # Each chunk is flushed, so every event can be decoded before the next chunk arrives.
+    stream = decompressor(encoding)
+    assert [stream.decompress(body) for body in bodies] == EVENTS
+    assert decompress(encoding, b"".join(bodies)) == b"".join(EVENTS)
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+async def test_repeated_content_round_trip(encoding):
+    # A tool's text result is repeated in its structured content.
+    body = BODY[:-2] + (',"structuredContent":{"result":"%s"}}}' % SNIPPET.replace("\n", "\\n")).encode()
+    encoder = ENCODERS[encoding]()
+    chunks = [encoder.encode(body[:700], final=False), encoder.encode(body[700:], final=False), encoder.encode(b"", final=True)]
+
+    assert decompress(encoding, b"".join(chunks)) == body
+
+
+async def test_small_response_sent_as_is():
+    small = b'{"jsonrpc":"2.0","id":1,"result":{}}'
+
+    headers, bodies = await call(CompressionMiddleware(app([small])), "gzip")
+
+    assert "content-encoding" not in headers
+    assert bodies == [small]
+
+
+async def test_small_first_chunk_leaves_stream_uncompressed():
+    headers, bodies = await call(CompressionMiddleware(app([b"event: ping\r\n\r\n", BODY], "text/event-stream")), "gzip")
+
+    assert "content-encoding" not in headers
+    assert bodies == [b"event: ping\r\n\r\n", BODY]
+
+
+@pytest.mark.parametrize("accept_encoding", ["", "identity", "br", "gzip;q=0"])
+async def test_not_compressed_unless_accepted(accept_encoding):
+    headers, bodies = await call(CompressionMiddleware(app([BODY])), accept_encoding)
+
+    assert "content-encoding" not in headers
+    assert bodies == [BODY]
+
+
+async def test_only_post_responses_compressed():
+    headers, bodies = await call(CompressionMiddleware(app([BODY])), "gzip", method="GET")
+
+    assert "content-encoding" not in headers
+    assert bodies == [BODY]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("*", SUPPORTED_ENCODINGS[0]),
+        ("*;q=0.1, gzip;q=0", "zstd" if zstd else None),
+        ("zstd;q=0.5, gzip", "gzip"),
+        ("GZIP;q=0.8", "gzip"),
+        ("deflate, br", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
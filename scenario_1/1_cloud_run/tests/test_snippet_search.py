@@ -0,0 +1,108 @@
+import time
+import threading
+
+import pytest
+
+from snippet_search import SnippetSearch, SnippetSearchIndex
+
+GO_SNIPPET = ("go", "0", "func filterEven(numbers []int) []int { return slices.DeleteFunc(numbers, isOdd) }")
+SQL_SNIPPET = ("sql", "0", "SELECT name FROM customers JOIN orders ON orders.customer_id = customers.id")
+
+
+# The term "retry" scores best in snippet 0, then 1, then 2; "timeout" best in 3, then 4, then 2. Snippet 2 is the only
+# one with both.
+RANKED_SNIPPETS = [
+    ("python", "0", "retry retry retry"),
+    ("python", "1", "retry retry"),
+    ("python", "2", "retry timeout"),
+    ("python", "3", "timeout timeout timeout"),
+    ("python", "4", "timeout timeout"),
+]
+
+
+class Source:
+    # A snippet source whose snippets can be replaced, bumping its version, and whose reads can be held up.
+    def __init__(self, snippets):
+        self.version = 0
+        self._snippets = snippets
+        self.readable = threading.Event()
+        self.readable.set()
+
+    def replace(self, snippets):
+        self._snippets = snippets
+        self.version += 1
+
+    def snippets(self):
+        self.readable.wait()
+        return list(self._snippets)
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_search_finds_snippets():
+    search = SnippetSearch(Source([GO_SNIPPET, SQL_SNIPPET]))
+
+    assert [result[1:] for result in search.search("filter even numbers")] == [("go", "0")]
+    assert [result[1:] for result in search.search("join orders", type="sql")] == [("sql", "0")]
+    assert search.search("join orders", type="go") == []
+
+
+def test_rebuild_does_not_block_searches():
+    source = Source([GO_SNIPPET])
+    search = SnippetSearch(source)
+
+    source.readable.clear()
+    source.replace([GO_SNIPPET, SQL_SNIPPET])
+    start = time.monotonic()
+    # The rebuild is held up reading the new snippets; searches answer from the previous index meanwhile.
+    assert search.search("join orders") == []
+    assert search.search("join orders") == []
+    assert time.monotonic() - start < 1
+    assert search.rebuilds == 0
+
+    source.readable.set()
+    wait_for(lambda: search.rebuilds == 1)
+    assert [result[1:] for result in search.search("join orders")] == [("sql", "0")]
+
+
+def test_rebuild_catches_up_with_later_changes():
+    source = Source([GO_SNIPPET])
+    search = SnippetSearch(source)
+
+    source.readable.clear()
+    source.replace([GO_SNIPPET])
+    search.search("join orders")
+    # Changed again while the first rebuild is under way.
+    source.replace([SQL_SNIPPET])
+    source.readable.set()
+
+    wait_for(lambda: search.search("join orders") != [])
+    wait_for(lambda: search._builder is None)
+    assert search.search("filter even") == []
+
+
+def ids(results) -> list[str]:
+    return [snippet_id for _, _, snippet_id in results]
+
+
+@pytest.mark.parametrize("postings_depth", [None, 0])
+def test_all_postings_kept_gives_exact_results(postings_depth):
+    index = SnippetSearchIndex(RANKED_SNIPPETS, postings_depth=postings_depth)
+
+    assert ids(index.search("retry")) == ["0", "1", "2"]
+    assert "2" in ids(index.search("retry timeout"))
+
+
+def test_postings_depth_drops_weaker_matches():
+    # Only the two best postings of each term are kept, so results are approximate.
+    index = SnippetSearchIndex(RANKED_SNIPPETS, postings_depth=2)
+
+    assert ids(index.search("retry")) == ["0", "1"]
+    assert ids(index.search("retry", type="python")) == ["0", "1"]
+    # Snippet 2 matches both words, but is outside the kept postings of each, so it is not found at all.
+    assert sorted(ids(index.search("retry timeout"))) == ["0", "1", "3", "4"]
@@ -1,5 +1,6 @@
 import os
 import logging
+import threading
 from pathlib import Path
 
 import google.auth
@@ -8,12 +9,18 @@ import google.oauth2.id_token
 
 from google.adk.agents import LlmAgent
 from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.agents.callback_context import CallbackContext
 
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
 from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
 
 from dotenv import load_dotenv
 
+from .token_cache import IdTokenCache
+from .shared.header_cache import MemoizedHeaderProvider
+from .shared.tool_cache import CachePolicy, ToolResultCache, lowercase_strings
+from .shared.tool_list_cache import CachedMcpToolset
+from .shared.session_pool import create_keepalive_http_client, use_session_pool
+
 # Load environment variables from the parent directory as this file
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -27,15 +34,22 @@ SERVICE_ACCOUNT_EMAIL = os.getenv("SERVICE_ACCOUNT_EMAIL")
 # This function retrieves an ID token for authenticating to the Cloud Run service using the service account of the 
 # running agent engine instance. The ID token is used in the Authorization header when making requests to the MCP 
 # server running on Cloud Run (protected by IAM authentication).
+def fetch_cloud_run_token(audience: str) -> str:
+
+    logger.info(f"Fetching ID token for audience: {audience}")
+
+    return google.oauth2.id_token.fetch_id_token(auth_req, audience)
+
+# ID tokens are valid for an hour, so rather than calling the metadata server on every MCP request the token is
+# cached per audience and refreshed in the background shortly before it expires.
+auth_req = google.auth.transport.requests.Request()
+id_token_cache = IdTokenCache(fetch_cloud_run_token)
+
 def get_cloud_run_token(target_url: str) -> str:
 
     audience = target_url.split('/mcp')[0]
-    logger.info(f"Audience: {audience}")
-
-    auth_req = google.auth.transport.requests.Request()
-    id_token = google.oauth2.id_token.fetch_id_token(auth_req, audience)
 
-    return id_token
+    return id_token_cache.get(audience)
 
 def mcp_logger(log_statement: str):
 
@@ -46,21 +60,93 @@ def header_provider(readonly_context: ReadonlyContext) -> dict[str, str]:
         "Authorization": f"Bearer {get_cloud_run_token(MCP_SERVER_URL)}"
     }
 
-cloud_run_mcp = McpToolset(
+def cached_cloud_run_token(readonly_context: ReadonlyContext) -> str | None:
+    return id_token_cache.peek(MCP_SERVER_URL.split('/mcp')[0])
+
+# The MCP requests of one agent turn share their headers: they are built once per invocation and rebuilt only when the
+# token cache holds a different token (after a background refresh) or the token is about to expire.
+mcp_header_provider = MemoizedHeaderProvider(header_provider, token_version=cached_cloud_run_token)
+
+# The server's tools only change when it is redeployed, so they are listed once and reused on later turns until the
+# server advertises a different tools version.
+TOOL_LIST_CACHE_TTL_SECONDS = float(os.getenv("TOOL_LIST_CACHE_TTL_SECONDS", 3600))
+
+cloud_run_mcp = CachedMcpToolset(
     connection_params=StreamableHTTPConnectionParams(
-        url=MCP_SERVER_URL
+        url=MCP_SERVER_URL,
+        httpx_client_factory=create_keepalive_http_client,
     ),
-    header_provider=header_provider,
+    header_provider=mcp_header_provider,
     errlog=mcp_logger,
+    ttl=TOOL_LIST_CACHE_TTL_SECONDS,
+)
+
+# Every call to the MCP server is made as the agent's service account, so a single initialized MCP session (and its
+# keep-alive connection) is shared by all requests and survives token refreshes. With MCP_SESSION_WARMUP enabled it is
+# opened in the background when the instance's first agent turn starts, while the model works out its first tool call.
+# Nothing is started when this module is imported; a custom app can call start_mcp_session_warmup() at startup.
+MCP_SESSION_IDLE_TIMEOUT_SECONDS = float(os.getenv("MCP_SESSION_IDLE_TIMEOUT_SECONDS", 300))
+MCP_SESSION_WARMUP = os.getenv("MCP_SESSION_WARMUP", "false").lower() == "true"
+
+mcp_session_pool = use_session_pool(
+    cloud_run_mcp,
+    principal_of=lambda headers: "agent_service_account",
+    max_sessions=1,
+    idle_timeout=MCP_SESSION_IDLE_TIMEOUT_SECONDS,
+)
+
+def warm_up_mcp_session():
+    try:
+        mcp_session_pool.warmup(header_provider(None)).result()
+        logger.info("MCP session warmed up")
+    except Exception as e:
+        logger.warning(f"MCP session warmup failed, the first request will open the session: {e}")
+
+_warmup_lock = threading.Lock()
+_warmup_started = False
+
+def start_mcp_session_warmup():
+    """
+    Opens the shared MCP session in a background thread, the first time it is called.
+    """
+    global _warmup_started
+    with _warmup_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+    threading.Thread(target=warm_up_mcp_session, name="mcp-session-warmup", daemon=True).start()
+
+def warm_up_on_first_turn(callback_context: CallbackContext) -> None:
+    if MCP_SESSION_WARMUP:
+        start_mcp_session_warmup()
+    return None
+
+# Snippets only change when the server's corpus is rebuilt, so identical tool calls are answered from a cache shared
+# by every session of this agent instead of making another authenticated round trip to the MCP server.
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", 600))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", 512))
+
+tool_cache = ToolResultCache(
+    policies={
+        "get_code_snippet": CachePolicy(ttl=TOOL_CACHE_TTL_SECONDS, normalize=lowercase_strings),
+        "get_code_snippets": CachePolicy(ttl=TOOL_CACHE_TTL_SECONDS, normalize=lowercase_strings),
+        "search_code_snippets": CachePolicy(ttl=TOOL_CACHE_TTL_SECONDS, normalize=lowercase_strings),
+    },
+    max_entries=TOOL_CACHE_MAX_ENTRIES,
 )
 
 root_agent = LlmAgent(
     model="gemini-2.5-pro",
     name="code_snippet_agent",
-    instruction="""You are a code snippet agent that has access to an MCP tool used to retrieve code snippets.
-    - If a user asks what you can do, answer that you can provide code snippets from the MCP tool you have access to.
+    instruction="""You are a code snippet agent that has access to MCP tools used to retrieve code snippets.
+    - If a user asks what you can do, answer that you can provide code snippets from the MCP tools you have access to.
     - Provide the types of snippets you can return i.e. sql, python, javascript, json, or go.
-    - Always use the MCP tool to get code snippets, never make up code snippets on your own.
+    - When a user asks for snippets of more than one type, call get_code_snippets once with all of the types instead
+      of calling get_code_snippet for each type.
+    - Always use the MCP tools to get code snippets, never make up code snippets on your own.
     """,
-    tools=[cloud_run_mcp]
+    tools=[cloud_run_mcp],
+    before_agent_callback=warm_up_on_first_turn,
+    before_tool_callback=[tool_cache.before_tool_callback],
+    after_tool_callback=[tool_cache.after_tool_callback],
 )
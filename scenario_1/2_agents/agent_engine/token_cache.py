@@ -0,0 +1,134 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import google.auth.jwt
+
+logger = logging.getLogger(__name__)
+
+# Tokens are refreshed in the background once they are within REFRESH_MARGIN_SECONDS of expiring and are
+# never handed out once they are within MIN_VALIDITY_SECONDS of expiring. Google-signed ID tokens are valid
+# for one hour, so the defaults keep a single token in use for roughly 55 minutes.
+REFRESH_MARGIN_SECONDS = 300
+MIN_VALIDITY_SECONDS = 30
+
+
+@dataclass
+class _CachedToken:
+    token: str
+    expires_at: float
+
+
+class IdTokenCache:
+    """
+    An in-process cache of ID tokens keyed by audience.
+
+    The expiry of each token is read from the JWT `exp` claim. Callers get the cached token until it is close to
+    expiring, at which point a single background thread fetches a replacement while the current token keeps being
+    served. Only when no usable token exists does a caller block on the fetch, and concurrent callers for the same
+    audience share that one fetch.
+    """
+    def __init__(
+        self,
+        fetch_token: Callable[[str], str],
+        refresh_margin: float = REFRESH_MARGIN_SECONDS,
+        min_validity: float = MIN_VALIDITY_SECONDS,
+    ):
+        self._fetch_token = fetch_token
+        self._refresh_margin = refresh_margin
+        self._min_validity = min_validity
+        self._tokens: dict[str, _CachedToken] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._refreshing: set[str] = set()
+        self._guard = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.fetch_seconds = 0.0
+
+    def get(self, audience: str) -> str:
+        """
+        Returns a valid ID token for the audience, fetching one only if no usable token is cached.
+        """
+        cached = self._usable(audience)
+        if cached:
+            self.hits += 1
+            if cached.expires_at - time.time() < self._refresh_margin:
+                self._refresh_in_background(audience)
+            return cached.token
+
+        # Single-flight: the first caller fetches while the others wait on the audience lock and then
+        # pick up the token it stored.
+        with self._lock_for(audience):
+            cached = self._usable(audience)
+            if cached:
+                self.hits += 1
+                return cached.token
+
+            self.misses += 1
+            return self._fetch(audience).token
+
+    def peek(self, audience: str) -> Optional[str]:
+        """
+        Returns the cached token for the audience, if any, without fetching or refreshing one.
+        """
+        cached = self._tokens.get(audience)
+        return cached.token if cached else None
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns the cache counters. `fetch_seconds_avg` multiplied by `hits` approximates the latency saved.
+        """
+        fetches = self.misses + self.refreshes
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "fetch_seconds_avg": self.fetch_seconds / fetches if fetches else 0.0,
+        }
+
+    def _usable(self, audience: str) -> Optional[_CachedToken]:
+        cached = self._tokens.get(audience)
+        if cached and cached.expires_at - time.time() > self._min_validity:
+            return cached
+        return None
+
+    def _lock_for(self, audience: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(audience, threading.Lock())
+
+    def _fetch(self, audience: str) -> _CachedToken:
+        start = time.perf_counter()
+        token = self._fetch_token(audience)
+        self.fetch_seconds += time.perf_counter() - start
+
+        claims = google.auth.jwt.decode(token, verify=False)
+        cached = _CachedToken(token=token, expires_at=float(claims["exp"]))
+        self._tokens[audience] = cached
+        return cached
+
+    def _refresh_in_background(self, audience: str):
+        with self._guard:
+            if audience in self._refreshing:
+                return
+            self._refreshing.add(audience)
+
+        threading.Thread(target=self._refresh, args=(audience,), daemon=True).start()
+
+    def _refresh(self, audience: str):
+        try:
+            with self._lock_for(audience):
+                self._fetch(audience)
+                self.refreshes += 1
+        except Exception as e:
+            # The current token is still valid, so a failed refresh is retried on the next request.
+            self.refresh_errors += 1
+            logger.warning(f"Background refresh of ID token for {audience} failed: {e}")
+        finally:
+            with self._guard:
+                self._refreshing.discard(audience)
@@ -1,11 +1,13 @@
 import os
 import logging
+import threading
 from pathlib import Path
 from httplib2 import Credentials
 
 import google.auth
 import google.auth.transport.requests
 from google.auth import impersonated_credentials
+from google.auth.credentials import TokenState
 
 from fastapi.openapi.models import OAuth2
 from fastapi.openapi.models import OAuthFlowAuthorizationCode
@@ -17,11 +19,14 @@ from google.adk.agents.callback_context import CallbackContext
 
 from google.adk.auth import AuthConfig, AuthCredential, AuthCredentialTypes, OAuth2Auth
 
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
 from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
 
 from dotenv import load_dotenv
 
+from .shared.header_cache import MemoizedHeaderProvider
+from .shared.tool_cache import CachePolicy, ToolResultCache, lowercase_strings
+from .shared.tool_list_cache import CachedMcpToolset
+
 # Load environment variables from the same directory as this file
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -32,18 +37,16 @@ logger = logging.getLogger()
 MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "MCP SERVER URL NOT SET")
 SERVICE_ACCOUNT_EMAIL = os.getenv("SERVICE_ACCOUNT_EMAIL")
 
-# This function retrieves an ID token for authenticating to the Cloud Run service using impersonated credentials.
-# It first loads the source credentials from the environment (using the application default credentials source via gcloud), 
-# then creates impersonated credentials for the target service account, and finally generates an 
-# ID token with the appropriate audience for the Cloud Run service. The ID token is used in the Authorization 
-# header when making requests to the MCP server running on Cloud Run (protected by IAM authentication).
-def get_cloud_run_token(target_url: str) -> str:
+# This function builds the credentials used to get an ID token for authenticating to the Cloud Run service using
+# impersonated credentials. It first loads the source credentials from the environment (using the application default
+# credentials source via gcloud), then creates impersonated credentials for the target service account, and finally
+# creates ID token credentials with the appropriate audience for the Cloud Run service. No token is requested here;
+# the credentials fetch one the first time they are refreshed.
+def build_id_token_credentials(target_url: str) -> impersonated_credentials.IDTokenCredentials:
 
     audience = target_url.split('/mcp')[0]
     logger.info(f"Audience: {audience}")
 
-    auth_req = google.auth.transport.requests.Request()
-
     target_scopes = [
         "https://www.googleapis.com/auth/cloud-platform",
         "https://www.googleapis.com/auth/userinfo.email",
@@ -65,47 +68,99 @@ def get_cloud_run_token(target_url: str) -> str:
 
     # get an ID token for the impersonated credentials to send to Cloud Run protected by IAM authentication.
     # The audience should be the URL of the Cloud Run service.
-    jwt_token = impersonated_credentials.IDTokenCredentials(
+    return impersonated_credentials.IDTokenCredentials(
         target_credentials=target_credentials,
         target_audience=audience,
         include_email=True,
     )
 
-    try:
-        jwt_token.refresh(auth_req)
-        id_token = jwt_token.token
+# The credential chain and the HTTP session used to refresh it are created once and reused for every request.
+# Nothing here touches the network at import time; the chain is built on the first tool call.
+auth_req = google.auth.transport.requests.Request()
+id_token_credentials = None
+id_token_credentials_lock = threading.Lock()
+
+# This function returns an ID token for the Cloud Run service, refreshing the impersonated credentials only when the
+# current token is missing or close to expiring. The ID token is used in the Authorization header when making
+# requests to the MCP server running on Cloud Run (protected by IAM authentication).
+def get_cloud_run_token(target_url: str) -> str:
+    global id_token_credentials
+
+    with id_token_credentials_lock:
+        if id_token_credentials is None:
+            id_token_credentials = build_id_token_credentials(target_url)
+
+        if id_token_credentials.token_state == TokenState.FRESH:
+            return id_token_credentials.token
 
-        # Use a tool like jwt.io to decode the token and verify 
-        # your user is impersonating the service account
-        logger.info(f"ID token: {id_token}")
+        try:
+            id_token_credentials.refresh(auth_req)
+            id_token = id_token_credentials.token
 
-        if not id_token:
-            raise ValueError("Failed to fetch ID token: received None")
-        return id_token
-    except Exception as e:
-        logger.info(f"Error fetching Cloud Run ID token for {target_url}: {e}")
-        raise
+            # Use a tool like jwt.io to decode the token and verify 
+            # your user is impersonating the service account
+            logger.info(f"ID token: {id_token}")
+
+            if not id_token:
+                raise ValueError("Failed to fetch ID token: received None")
+            return id_token
+        except Exception as e:
+            logger.info(f"Error fetching Cloud Run ID token for {target_url}: {e}")
+            raise
 
 def mcp_logger(log_statement: str):
     logger.info(f"[McpToolset] {log_statement}", exc_info=True)
 
-cloud_run_mcp = McpToolset(
+def header_provider(readonly_context: ReadonlyContext) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {get_cloud_run_token(MCP_SERVER_URL)}"
+    }
+
+def current_cloud_run_token(readonly_context: ReadonlyContext) -> str | None:
+    return id_token_credentials.token if id_token_credentials is not None else None
+
+# The MCP requests of one agent turn share their headers: they are built once per invocation and rebuilt only when the
+# impersonated credentials hold a different token or the token is about to expire.
+mcp_header_provider = MemoizedHeaderProvider(header_provider, token_version=current_cloud_run_token)
+
+# The server's tools only change when it is redeployed, so they are listed once and reused on later turns until the
+# server advertises a different tools version.
+TOOL_LIST_CACHE_TTL_SECONDS = float(os.getenv("TOOL_LIST_CACHE_TTL_SECONDS", 3600))
+
+cloud_run_mcp = CachedMcpToolset(
     connection_params=StreamableHTTPConnectionParams(
-        url=MCP_SERVER_URL,
-        headers={
-            "Authorization": f"Bearer {get_cloud_run_token(MCP_SERVER_URL)}",
-        }
+        url=MCP_SERVER_URL
     ),
-    errlog=mcp_logger
+    header_provider=mcp_header_provider,
+    errlog=mcp_logger,
+    ttl=TOOL_LIST_CACHE_TTL_SECONDS,
+)
+
+# Snippets only change when the server's corpus is rebuilt, so identical tool calls are answered from a cache shared
+# by every session of this agent instead of making another authenticated round trip to the MCP server.
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", 600))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", 512))
+
+tool_cache = ToolResultCache(
+    policies={
+        "get_code_snippet": CachePolicy(ttl=TOOL_CACHE_TTL_SECONDS, normalize=lowercase_strings),
+        "get_code_snippets": CachePolicy(ttl=TOOL_CACHE_TTL_SECONDS, normalize=lowercase_strings),
+        "search_code_snippets": CachePolicy(ttl=TOOL_CACHE_TTL_SECONDS, normalize=lowercase_strings),
+    },
+    max_entries=TOOL_CACHE_MAX_ENTRIES,
 )
 
 root_agent = LlmAgent(
     model="gemini-2.5-pro",
     name="code_snippet_agent",
-    instruction="""You are a code snippet agent that has access to an MCP tool used to retrieve code snippets.
-    - If a user asks what you can do, answer that you can provide code snippets from the MCP tool you have access to.
+    instruction="""You are a code snippet agent that has access to MCP tools used to retrieve code snippets.
+    - If a user asks what you can do, answer that you can provide code snippets from the MCP tools you have access to.
     - Provide the types of snippets you can return i.e. sql, python, javascript, json, or go.
-    - Always use the MCP tool to get code snippets, never make up code snippets on your own.
+    - When a user asks for snippets of more than one type, call get_code_snippets once with all of the types instead
+      of calling get_code_snippet for each type.
+    - Always use the MCP tools to get code snippets, never make up code snippets on your own.
     """,
-    tools=[cloud_run_mcp]
+    tools=[cloud_run_mcp],
+    before_tool_callback=[tool_cache.before_tool_callback],
+    after_tool_callback=[tool_cache.after_tool_callback],
 )
@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+import subprocess
+
+import requests
+
+# Compares the old blocking userinfo call (requests.get with no session, run on the event loop) with the pooled
+# async client used by the MCP server, using many concurrent callers against the local fake userinfo endpoint.
+# Use --error-rate and --slow-rate to inject upstream failures and tail latency and see how the server's retries,
+# circuit breaker and hedging (USERINFO_HEDGE=true) cope.
+# run: uv run python benchmark_userinfo.py --callers 100 --latency 0.05
+PORT = 9091
+USERINFO_URL = f"http://127.0.0.1:{PORT}/oauth2/v3/userinfo"
+
+os.environ["USERINFO_ENDPOINT"] = USERINFO_URL
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+import main  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# The fake upstream runs in its own process so it does not compete with the benchmark for the event loop.
+def start_fake_upstream(args: argparse.Namespace) -> subprocess.Popen:
+    fake_google = os.path.join(os.path.dirname(__file__), "fake_google.py")
+    process = subprocess.Popen([
+        sys.executable, fake_google,
+        "--port", str(PORT),
+        "--latency", str(args.latency),
+        "--error-rate", str(args.error_rate),
+        "--slow-rate", str(args.slow_rate),
+        "--slow-latency", str(args.slow_latency),
+        # Every caller sends its own synthetic token.
+        "--accept-any-token",
+    ])
+    while True:
+        try:
+            requests.get(USERINFO_URL)
+            return process
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+
+async def blocking_fetch(access_token: str) -> dict:
+    response = requests.get(USERINFO_URL, headers={"Authorization": f"Bearer {access_token}"})
+    response.raise_for_status()
+    return response.json()
+
+async def run(name: str, fetch, callers: int):
+    latencies = []
+    errors = 0
+
+    async def caller(i: int):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            await fetch(f"token-{name}-{i}")
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(i) for i in range(callers)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:<10} callers={callers} total={elapsed:.3f}s throughput={callers / elapsed:.1f} req/s "
+        f"p50={statistics.median(latencies) * 1000:.1f}ms p95={p95 * 1000:.1f}ms errors={errors}"
+    )
+
+async def benchmark(callers: int):
+    # Warm up both paths so connection setup is not counted, and give the server's latency tracker enough
+    # samples to derive the hedging delay.
+    for i in range(25):
+        for fetch in (blocking_fetch, main.fetch_user_info):
+            try:
+                await fetch(f"warmup-{i}")
+            except Exception:
+                pass
+
+    await run("before", blocking_fetch, callers)
+    await run("after", main.fetch_user_info, callers)
+    print(f"after      upstream: {main.userinfo_upstream.stats()}")
+    await main.http_client.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark userinfo lookups under concurrent callers.")
+    parser.add_argument("--callers", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Upstream latency in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of upstream requests that fail with a 503.")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of upstream requests that are slow.")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="Latency of slow upstream requests in seconds.")
+    args = parser.parse_args()
+
+    upstream = start_fake_upstream(args)
+    try:
+        asyncio.run(benchmark(args.callers))
+    finally:
+        upstream.terminate()
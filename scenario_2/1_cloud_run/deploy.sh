@@ -94,7 +94,8 @@ if ! gcloud artifacts repositories describe "${REPO_NAME}" --location="${REGION}
 fi
 
 # Submit the build with substitutions
-gcloud builds submit \
+# The build context is the repository root, so the image can include the modules in shared/.
+gcloud builds submit ../.. \
   --config=cloudbuild.yaml \
   --project="${PROJECT_ID}" \
   --region="${REGION}" \
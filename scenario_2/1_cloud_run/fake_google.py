@@ -0,0 +1,293 @@
+import json
+import time
+import random
+import asyncio
+import secrets
+import argparse
+import logging
+from datetime import datetime, timezone
+from typing import Iterable
+from urllib.parse import urlencode
+
+import jwt
+import uvicorn
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, RedirectResponse, Response
+from starlette.routing import Route
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format="[%(levelname)s]: %(message)s", level=logging.INFO)
+
+ISSUER = "https://accounts.google.com"
+KEY_ID = "fake-google-key"
+JWT_BEARER_GRANT = "urn:ietf:params:oauth:grant-type:jwt-bearer"
+
+# A signing key generated per process. Tokens minted by mint_id_token verify only against the JWKS served by the
+# same process.
+signing_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+FAKE_USER = {
+    "sub": "1234567890",
+    "name": "Test User",
+    "email": "test.user@example.com",
+    "picture": "https://example.com/test-user.png",
+}
+
+# The service account the metadata server and the IAM Credentials API issue tokens for, unless impersonation names
+# another one.
+FAKE_SERVICE_ACCOUNT = {
+    "sub": "1098765432",
+    "email": "fake-agent@fake-project.iam.gserviceaccount.com",
+    "email_verified": True,
+}
+FAKE_PROJECT_ID = "fake-project"
+
+def mint_id_token(audience: str, lifetime: int = 3600, subject: dict = FAKE_USER, **claims) -> str:
+    """
+    Returns an RS256-signed ID token for the subject (the fake user by default), in the shape of a Google-issued ID
+    token.
+    """
+    now = int(time.time())
+    payload = {**subject, "iss": ISSUER, "aud": audience, "iat": now, "exp": now + lifetime, **claims}
+    return jwt.encode(payload, signing_key, algorithm="RS256", headers={"kid": KEY_ID})
+
+def mint_access_token() -> str:
+    # Google OAuth access tokens are opaque; these only need to look like one.
+    return f"ya29.fake-{secrets.token_urlsafe(24)}"
+
+def jwks() -> dict:
+    public_jwk = jwt.algorithms.RSAAlgorithm.to_jwk(signing_key.public_key(), as_dict=True)
+    return {"keys": [{**public_jwk, "kid": KEY_ID, "alg": "RS256", "use": "sig"}]}
+
+def adc_file(base_url: str) -> dict:
+    """
+    Returns a key file for the fake service account whose tokens are fetched from this service, for use as
+    GOOGLE_APPLICATION_CREDENTIALS. (google-auth ignores the token_uri of user credentials, but not of a service account
+    key.)
+    """
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return {
+        "type": "service_account",
+        "project_id": FAKE_PROJECT_ID,
+        "private_key_id": "fake-adc-key",
+        "private_key": key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode("ascii"),
+        "client_email": FAKE_SERVICE_ACCOUNT["email"],
+        "client_id": FAKE_SERVICE_ACCOUNT["sub"],
+        "token_uri": f"{base_url}/token",
+    }
+
+# A local stand-in for the Google identity endpoints the agents and MCP servers call, used to benchmark and test the
+# auth paths without network access. It serves:
+#   /oauth2/v3/userinfo    - answers with the fake user for an access token this service issued and that has not
+#                            expired or been revoked, and with a 401 for any other token
+#   /oauth2/v3/certs       - the JWKS that verifies every ID token minted here
+#   /o/oauth2/auth         - the OAuth consent screen: redirects straight back to redirect_uri with a code
+#   /token                 - the OAuth token endpoint: exchanges codes and refresh tokens for an access token and an
+#                            ID token for the fake user, and service account assertions for an access token
+#   /revoke                - the OAuth revocation endpoint: adds the token to the deny-list
+#   /computeMetadata/v1/   - the metadata server's service account identity (ID token), token and project ID, as
+#                            fetch_id_token and google.auth.default() use them on Agent Engine
+#   /v1/projects/-/serviceAccounts/<email>:generateIdToken and :generateAccessToken
+#                          - the IAM Credentials API used to impersonate a service account
+# Every endpoint but the JWKS answers after a fixed delay (latency). A share of requests can be made to fail with a
+# 503 (error_rate) or to take slow_latency seconds instead (slow_rate) to exercise retries, the circuit breaker and
+# hedging.
+#
+# Load tests that send synthetic tokens, which this service never issued, can accept any token that is not on the
+# deny-list (accept_any_token). revoked_tokens seeds the deny-list.
+#
+# Point the scenario 2 MCP server at it with USERINFO_ENDPOINT=http://localhost:9090/oauth2/v3/userinfo and
+# AUTH_JWKS_URI=http://localhost:9090/oauth2/v3/certs, and the agents with:
+#   scenario 1 Agent Engine agent: GCE_METADATA_HOST=localhost:9090 GCE_METADATA_IP=localhost:9090
+#   scenario 1 local agent:        GOOGLE_APPLICATION_CREDENTIALS=<file written by --write-adc>
+#                                  IAM_CREDENTIALS_ENDPOINT=http://localhost:9090
+#                                  PYTHONPATH=<this directory>/fake_google_site (see its sitecustomize.py)
+#   scenario 2 local agent:        AUTHORIZATION_URL=http://localhost:9090/o/oauth2/auth
+#                                  TOKEN_URI=http://localhost:9090/token
+def create_app(
+    latency: float = 0.05,
+    error_rate: float = 0.0,
+    slow_rate: float = 0.0,
+    slow_latency: float = 1.0,
+    token_lifetime: int = 3600,
+    accept_any_token: bool = False,
+    revoked_tokens: Iterable[str] = (),
+) -> Starlette:
+
+    # The expiry time of every access token issued by this app, and the tokens revoked since.
+    issued_tokens: dict[str, float] = {}
+    revoked = set(revoked_tokens)
+
+    def issue_access_token() -> str:
+        access_token = mint_access_token()
+        issued_tokens[access_token] = time.time() + token_lifetime
+        return access_token
+
+    def token_is_valid(access_token: str) -> bool:
+        if access_token in revoked:
+            return False
+        return accept_any_token or issued_tokens.get(access_token, 0) > time.time()
+
+    async def inject_faults() -> Response | None:
+        await asyncio.sleep(slow_latency if random.random() < slow_rate else latency)
+        if random.random() < error_rate:
+            return JSONResponse({"error": "backend_error"}, status_code=503)
+        return None
+
+    def metadata_request(request: Request) -> bool:
+        return request.headers.get("metadata-flavor") == "Google"
+
+    async def userinfo(request: Request) -> Response:
+        auth_header = request.headers.get("authorization", "")
+        if not auth_header.lower().startswith("bearer "):
+            return JSONResponse({"error": "invalid_request"}, status_code=401)
+
+        if faulted := await inject_faults():
+            return faulted
+        if not token_is_valid(auth_header[len("bearer "):].strip()):
+            return JSONResponse({"error": "invalid_token"}, status_code=401)
+        return JSONResponse(FAKE_USER)
+
+    async def certs(request: Request) -> JSONResponse:
+        return JSONResponse(jwks(), headers={"Cache-Control": "public, max-age=3600"})
+
+    async def authorize(request: Request) -> Response:
+        params = request.query_params
+        if "redirect_uri" not in params:
+            return JSONResponse({"error": "invalid_request"}, status_code=400)
+
+        query = urlencode({"code": f"fake-code-{secrets.token_urlsafe(8)}", "state": params.get("state", "")})
+        separator = "&" if "?" in params["redirect_uri"] else "?"
+        return RedirectResponse(f"{params['redirect_uri']}{separator}{query}", status_code=302)
+
+    async def token(request: Request) -> Response:
+        form = await request.form()
+        grant_type = form.get("grant_type")
+        if grant_type not in ("authorization_code", "refresh_token", JWT_BEARER_GRANT):
+            return JSONResponse({"error": "unsupported_grant_type"}, status_code=400)
+
+        if faulted := await inject_faults():
+            return faulted
+        if grant_type == JWT_BEARER_GRANT:
+            # A service account key exchanging a signed assertion; the assertion isn't verified.
+            return JSONResponse({"access_token": issue_access_token(), "expires_in": token_lifetime, "token_type": "Bearer"})
+        return JSONResponse({
+            "access_token": issue_access_token(),
+            "expires_in": token_lifetime,
+            "token_type": "Bearer",
+            "scope": form.get("scope", "openid https://www.googleapis.com/auth/userinfo.email"),
+            "refresh_token": form.get("refresh_token", "fake-refresh-token"),
+            "id_token": mint_id_token(form.get("client_id", "fake-client-id.apps.googleusercontent.com"), token_lifetime),
+        })
+
+    async def revoke(request: Request) -> Response:
+        form = await request.form()
+        revoked_token = request.query_params.get("token") or form.get("token")
+        if not revoked_token:
+            return JSONResponse({"error": "invalid_request"}, status_code=400)
+        revoked.add(revoked_token)
+        return JSONResponse({})
+
+    async def metadata_ping(request: Request) -> Response:
+        return PlainTextResponse("", headers={"Metadata-Flavor": "Google"})
+
+    async def metadata(request: Request) -> Response:
+        if not metadata_request(request):
+            return PlainTextResponse("Missing Metadata-Flavor header", status_code=403)
+
+        if faulted := await inject_faults():
+            return faulted
+
+        path = request.path_params["path"].rstrip("/")
+        headers = {"Metadata-Flavor": "Google"}
+        if path in ("instance/service-accounts/default", "instance/service-accounts/default/email"):
+            account = {"email": FAKE_SERVICE_ACCOUNT["email"], "aliases": ["default"], "scopes": ["https://www.googleapis.com/auth/cloud-platform"]}
+            if path.endswith("/email"):
+                return PlainTextResponse(account["email"], headers=headers)
+            return JSONResponse(account, headers=headers)
+        if path == "instance/service-accounts/default/identity":
+            audience = request.query_params.get("audience")
+            if not audience:
+                return PlainTextResponse("audience is required", status_code=400, headers=headers)
+            return PlainTextResponse(mint_id_token(audience, token_lifetime, FAKE_SERVICE_ACCOUNT), headers=headers)
+        if path == "instance/service-accounts/default/token":
+            return JSONResponse(
+                {"access_token": issue_access_token(), "expires_in": token_lifetime, "token_type": "Bearer"},
+                headers=headers,
+            )
+        if path == "project/project-id":
+            return PlainTextResponse(FAKE_PROJECT_ID, headers=headers)
+        return PlainTextResponse("Not found", status_code=404, headers=headers)
+
+    async def iam_credentials(request: Request) -> Response:
+        # The path ends in "<service account email>:<method>".
+        email, _, method = request.path_params["name"].rpartition(":")
+        if not request.headers.get("authorization", "").lower().startswith("bearer "):
+            return JSONResponse({"error": {"code": 401, "status": "UNAUTHENTICATED"}}, status_code=401)
+        if method not in ("generateIdToken", "generateAccessToken"):
+            return JSONResponse({"error": {"code": 404, "status": "NOT_FOUND"}}, status_code=404)
+
+        if faulted := await inject_faults():
+            return faulted
+
+        body = await request.json()
+        subject = {**FAKE_SERVICE_ACCOUNT, "email": email}
+        if method == "generateIdToken":
+            claims = subject if body.get("includeEmail") else {"sub": subject["sub"]}
+            return JSONResponse({"token": mint_id_token(body["audience"], token_lifetime, claims)})
+
+        expire_time = datetime.fromtimestamp(time.time() + token_lifetime, timezone.utc)
+        return JSONResponse({"accessToken": issue_access_token(), "expireTime": expire_time.strftime("%Y-%m-%dT%H:%M:%SZ")})
+
+    return Starlette(routes=[
+        Route("/oauth2/v3/userinfo", userinfo),
+        Route("/oauth2/v3/certs", certs),
+        Route("/o/oauth2/auth", authorize),
+        Route("/o/oauth2/v2/auth", authorize),
+        Route("/token", token, methods=["POST"]),
+        Route("/revoke", revoke, methods=["POST"]),
+        Route("/", metadata_ping),
+        Route("/computeMetadata/v1/{path:path}", metadata),
+        Route("/v1/projects/-/serviceAccounts/{name:path}", iam_credentials, methods=["POST"]),
+    ])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run fake Google identity endpoints.")
+    parser.add_argument("--port", type=int, default=9090)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds to wait before answering a request.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 503.")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests that are slow.")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="Seconds a slow request takes.")
+    parser.add_argument("--token-lifetime", type=int, default=3600, help="Seconds the minted tokens are valid for.")
+    parser.add_argument("--accept-any-token", action="store_true", help="Accept tokens this service didn't issue.")
+    parser.add_argument("--revoke-token", action="append", default=[], help="Reject this token. Can be repeated.")
+    parser.add_argument("--audience", help="Print an ID token for this audience that verifies against the JWKS.")
+    parser.add_argument("--write-adc", help="Write application default credentials that use this service to this file.")
+    args = parser.parse_args()
+
+    if args.audience:
+        print(mint_id_token(args.audience, args.token_lifetime), flush=True)
+    if args.write_adc:
+        with open(args.write_adc, "w") as f:
+            json.dump(adc_file(f"http://127.0.0.1:{args.port}"), f, indent=2)
+
+    logger.info(f"🚀 Fake Google endpoints started on port {args.port}")
+    uvicorn.run(
+        create_app(
+            args.latency,
+            args.error_rate,
+            args.slow_rate,
+            args.slow_latency,
+            args.token_lifetime,
+            accept_any_token=args.accept_any_token,
+            revoked_tokens=args.revoke_token,
+        ),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning",
+    )
@@ -0,0 +1,18 @@
+"""
+Sends google-auth's IAM Credentials API calls to fake_google.py.
+
+Put this directory on PYTHONPATH, together with IAM_CREDENTIALS_ENDPOINT=http://localhost:9090, when running the
+scenario 1 local agent against the stand-in. Python imports it at interpreter startup, before the agent is loaded.
+google-auth has no public endpoint override for impersonated ID tokens and reads these templates on every refresh,
+so they are redirected here rather than in the agent.
+"""
+import os
+
+IAM_CREDENTIALS_ENDPOINT = os.getenv("IAM_CREDENTIALS_ENDPOINT")
+
+if IAM_CREDENTIALS_ENDPOINT:
+    import google.auth.iam
+
+    base_url = f"{IAM_CREDENTIALS_ENDPOINT.rstrip('/')}/v1/projects/-/serviceAccounts/{{}}"
+    google.auth.iam._IAM_ENDPOINT = base_url + ":generateAccessToken"
+    google.auth.iam._IAM_IDTOKEN_ENDPOINT = base_url + ":generateIdToken"
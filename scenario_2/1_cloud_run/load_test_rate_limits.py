@@ -0,0 +1,107 @@
+import os
+import re
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+from collections import Counter
+
+import httpx
+from fastmcp import Client
+from fastmcp.client.transports import StreamableHttpTransport
+from fastmcp.exceptions import ToolError
+from mcp import McpError
+
+# Demonstrates the server's admission control: one noisy user sends bursts of concurrent tool calls while a few
+# quiet users call at a steady pace. The noisy user should see rate_limited / principal_busy rejections while the
+# quiet users are unaffected. The MCP server and the fake userinfo endpoint are started as local processes.
+# run: uv run python load_test_rate_limits.py --duration 10
+SERVER_PORT = 8081
+UPSTREAM_PORT = 9092
+SERVER_URL = f"http://127.0.0.1:{SERVER_PORT}/mcp"
+TOOL_ARGS = {"context": {"message": {}}}
+
+def start(args: list[str], env: dict, ready_url: str) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable, *args], env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while True:
+        try:
+            httpx.get(ready_url)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+async def call(client: Client, results: Counter):
+    try:
+        await client.call_tool("get_user_info_from_access_token", TOOL_ARGS)
+        results["ok"] += 1
+    except (ToolError, McpError) as e:
+        # Admission rejections name their reason in the error message, e.g. "(reason: rate_limited, ...)".
+        match = re.search(r"reason: (\w+)", str(e))
+        results[match.group(1) if match else type(e).__name__] += 1
+    except Exception as e:
+        results[type(e).__name__] += 1
+
+async def noisy_user(duration: float, concurrency: int, results: Counter):
+    transport = StreamableHttpTransport(SERVER_URL, headers={"Authorization": "Bearer ya29.noisy-user"})
+    async with Client(transport) as client:
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            await asyncio.gather(*(call(client, results) for _ in range(concurrency)))
+
+async def quiet_user(name: str, duration: float, results: Counter):
+    transport = StreamableHttpTransport(SERVER_URL, headers={"Authorization": f"Bearer ya29.{name}"})
+    async with Client(transport) as client:
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            await call(client, results)
+            await asyncio.sleep(1)
+
+async def load_test(duration: float, concurrency: int, quiet_users: int):
+    noisy = Counter()
+    quiet = Counter()
+    await asyncio.gather(
+        noisy_user(duration, concurrency, noisy),
+        *(quiet_user(f"quiet-user-{i}", duration, quiet) for i in range(quiet_users)),
+    )
+
+    print(f"{'principal':<12} {'result':<16} {'count':>6}")
+    for principal, results in (("noisy", noisy), ("quiet", quiet)):
+        for result, count in sorted(results.items()):
+            print(f"{principal:<12} {result:<16} {count:>6}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the per-user rate limits and in-flight caps.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run the test for.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent calls per burst from the noisy user.")
+    parser.add_argument("--quiet-users", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="Upstream userinfo latency in seconds.")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    upstream = start(
+        [
+            os.path.join(here, "fake_google.py"),
+            "--port", str(UPSTREAM_PORT),
+            "--latency", str(args.latency),
+            # The users send synthetic tokens.
+            "--accept-any-token",
+        ],
+        env={},
+        ready_url=f"http://127.0.0.1:{UPSTREAM_PORT}/oauth2/v3/certs",
+    )
+    server = start(
+        [os.path.join(here, "src", "main.py")],
+        env={
+            "PORT": str(SERVER_PORT),
+            "USERINFO_ENDPOINT": f"http://127.0.0.1:{UPSTREAM_PORT}/oauth2/v3/userinfo",
+            # Disable the userinfo cache so every admitted call reaches the upstream.
+            "USERINFO_CACHE_MAX_ENTRIES": "0",
+        },
+        ready_url=SERVER_URL,
+    )
+    try:
+        asyncio.run(load_test(args.duration, args.concurrency, args.quiet_users))
+    finally:
+        server.terminate()
+        upstream.terminate()
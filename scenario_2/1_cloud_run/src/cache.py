@@ -0,0 +1,73 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+def hash_token(token: str) -> str:
+    """
+    Returns a SHA-256 digest of a bearer token so it can be used as a cache key without keeping the raw token.
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    A bounded, thread-safe cache whose entries expire after a per-entry TTL.
+
+    When the cache is full the least recently used entry is evicted to make room for a new one.
+    """
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached value for the key, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Stores a value for `ttl` seconds (the cache default if not given). Non-positive TTLs are not stored.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,127 @@
+import re
+import time
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+import jwt
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_JWKS_URI = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+
+# Used when the JWKS response has no Cache-Control max-age, and as the minimum time between refetches triggered by
+# an unknown key id so a flood of tokens with made-up `kid`s cannot turn into a flood of JWKS requests.
+DEFAULT_JWKS_MAX_AGE_SECONDS = 3600
+MIN_JWKS_REFRESH_INTERVAL_SECONDS = 60
+
+
+class JWKSError(Exception):
+    """
+    The signing keys could not be fetched, or the JWKS response could not be parsed.
+    """
+
+
+class JWKSCache:
+    """
+    The signing keys published at a JWKS URI, fetched once and reused until the response's Cache-Control max-age
+    expires. A token signed with a key id that is not in the cache triggers an early refetch to pick up rotated keys.
+    """
+    def __init__(
+        self,
+        jwks_uri: str,
+        http_client: httpx.AsyncClient,
+        min_refresh_interval: float = MIN_JWKS_REFRESH_INTERVAL_SECONDS,
+    ):
+        self.jwks_uri = jwks_uri
+        self._http_client = http_client
+        self._min_refresh_interval = min_refresh_interval
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+        self.fetches = 0
+
+    async def get_key(self, kid: str) -> Optional[jwt.PyJWK]:
+        """
+        Returns the signing key with the given key id, or None if the JWKS does not contain it.
+
+        Raises:
+            JWKSError: If the keys had to be fetched and could not be.
+        """
+        if time.monotonic() >= self._expires_at:
+            await self._refresh(expired_at=self._expires_at)
+
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._fetched_at >= self._min_refresh_interval:
+            await self._refresh(expired_at=self._expires_at)
+            key = self._keys.get(kid)
+        return key
+
+    async def _refresh(self, expired_at: float):
+        async with self._lock:
+            # Another request refreshed the keys while this one was waiting for the lock.
+            if self._expires_at != expired_at:
+                return
+
+            try:
+                response = await self._http_client.get(self.jwks_uri)
+                response.raise_for_status()
+                jwks = response.json()
+                if not isinstance(jwks, dict):
+                    raise ValueError(f"Expected a JSON object, got {type(jwks).__name__}")
+                jwk_set = jwt.PyJWKSet.from_dict(jwks)
+            except (httpx.HTTPError, ValueError, jwt.PyJWKError, jwt.PyJWKSetError) as e:
+                raise JWKSError(f"Unable to load signing keys from {self.jwks_uri}: {e!r}") from e
+
+            now = time.monotonic()
+            self._keys = {key.key_id: key for key in jwk_set.keys}
+            self._fetched_at = now
+            self._expires_at = now + _max_age(response.headers.get("cache-control"))
+            self.fetches += 1
+            logger.info(f">>> 🔑 JWKS: Fetched {len(self._keys)} signing keys from {self.jwks_uri}")
+
+
+class JWTVerifier:
+    """
+    Verifies JWT bearer tokens locally against the keys in a JWKS cache, checking the signature, `aud`, `iss`
+    and `exp` claims.
+    """
+    def __init__(self, jwks: JWKSCache, audiences: list[str], issuers: tuple[str, ...] = GOOGLE_ISSUERS):
+        self.jwks = jwks
+        self.audiences = audiences
+        self.issuers = issuers
+
+    async def verify(self, token: str) -> dict:
+        """
+        Returns the claims of a valid token.
+
+        Raises:
+            jwt.InvalidTokenError: If the token is malformed, signed by an unknown key, expired, or issued for
+                another audience or by another issuer.
+            JWKSError: If the signing keys could not be loaded.
+        """
+        header = jwt.get_unverified_header(token)
+        key = await self.jwks.get_key(header.get("kid", ""))
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key: {header.get('kid')}")
+
+        claims = jwt.decode(
+            token,
+            key=key,
+            algorithms=["RS256"],
+            audience=self.audiences,
+            options={"require": ["aud", "iss", "exp"]},
+            leeway=10,
+        )
+        if claims["iss"] not in self.issuers:
+            raise jwt.InvalidIssuerError(f"Invalid issuer: {claims['iss']}")
+        return claims
+
+
+def _max_age(cache_control: Optional[str]) -> float:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return float(match.group(1)) if match else DEFAULT_JWKS_MAX_AGE_SECONDS
@@ -1,23 +1,178 @@
 import asyncio
 import logging
 import os
+import time
 import contextvars
-import requests
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+import jwt
+import google.auth.jwt
 
 from fastmcp import FastMCP
 from fastmcp.server.dependencies import get_http_headers
 from fastmcp.server.middleware import Middleware, MiddlewareContext
+from fastmcp.server.middleware.rate_limiting import TokenBucketRateLimiter
+from mcp import McpError
+from mcp.types import ErrorData
+
+from cache import TTLCache, hash_token
+from singleflight import SingleFlight
+from jwt_verifier import GOOGLE_JWKS_URI, JWKSCache, JWKSError, JWTVerifier
+from resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+from shared.serve import APP, MCP_JSON_RESPONSE, serve, stateless_http, worker_count
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(format="[%(levelname)s]: %(message)s", level=logging.INFO)
 
 user_token = contextvars.ContextVar("user_token", default=None)
+user_claims = contextvars.ContextVar("user_claims", default=None)
+
+# --- Userinfo Cache ---
+# Userinfo responses are cached in-process keyed by a hash of the bearer token, so repeat calls from the same user
+# skip the round trip to Google. An entry never outlives the token it was fetched with.
+USERINFO_ENDPOINT = os.getenv("USERINFO_ENDPOINT", "https://www.googleapis.com/oauth2/v3/userinfo")
+USERINFO_CACHE_TTL_SECONDS = float(os.getenv("USERINFO_CACHE_TTL_SECONDS", 300))
+USERINFO_CACHE_MAX_ENTRIES = int(os.getenv("USERINFO_CACHE_MAX_ENTRIES", 1024))
+
+userinfo_cache = TTLCache(max_entries=USERINFO_CACHE_MAX_ENTRIES, ttl=USERINFO_CACHE_TTL_SECONDS)
+
+# --- Rejected Token Cache ---
+# Hashes of tokens that were recently rejected (by local JWT verification or with a 401 from the userinfo endpoint)
+# are remembered for a short time so repeat requests with the same bad token are refused in the middleware, before
+# any tool dispatch or upstream call.
+AUTH_NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv("AUTH_NEGATIVE_CACHE_TTL_SECONDS", 30))
+AUTH_NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_NEGATIVE_CACHE_MAX_ENTRIES", 10000))
+
+rejected_tokens = TTLCache(max_entries=AUTH_NEGATIVE_CACHE_MAX_ENTRIES, ttl=AUTH_NEGATIVE_CACHE_TTL_SECONDS)
+
+def token_remaining_lifetime(token: str) -> Optional[float]:
+    """
+    Returns the seconds until a JWT bearer token expires, or None for opaque tokens whose expiry is not known locally.
+    """
+    if not token.startswith("eyJ"):
+        return None
+    try:
+        claims = google.auth.jwt.decode(token, verify=False)
+        return float(claims["exp"]) - time.time()
+    except Exception:
+        return None
+
+# --- Userinfo Client ---
+# A single pooled, keep-alive HTTP client is shared by every tool call so requests reuse TLS connections. Explicit
+# timeouts and a concurrency limit keep a slow upstream from tying up the server's event loop and connections.
+USERINFO_CONNECT_TIMEOUT_SECONDS = float(os.getenv("USERINFO_CONNECT_TIMEOUT_SECONDS", 2))
+USERINFO_READ_TIMEOUT_SECONDS = float(os.getenv("USERINFO_READ_TIMEOUT_SECONDS", 5))
+USERINFO_MAX_CONCURRENCY = int(os.getenv("USERINFO_MAX_CONCURRENCY", 64))
+
+http_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(
+        connect=USERINFO_CONNECT_TIMEOUT_SECONDS,
+        read=USERINFO_READ_TIMEOUT_SECONDS,
+        write=USERINFO_READ_TIMEOUT_SECONDS,
+        pool=USERINFO_CONNECT_TIMEOUT_SECONDS,
+    ),
+    limits=httpx.Limits(
+        max_connections=USERINFO_MAX_CONCURRENCY,
+        max_keepalive_connections=USERINFO_MAX_CONCURRENCY,
+    ),
+)
+userinfo_semaphore = asyncio.Semaphore(USERINFO_MAX_CONCURRENCY)
+
+# --- Userinfo Resilience ---
+# Calls to the userinfo endpoint are retried with jittered backoff on connection errors, timeouts, 429s and 5xxs
+# (never on 401/403), a circuit breaker fails calls fast once most recent calls have failed, and hedging (off by
+# default) sends a second request when the first is slower than the recent p95 latency.
+USERINFO_MAX_ATTEMPTS = int(os.getenv("USERINFO_MAX_ATTEMPTS", 3))
+USERINFO_RETRY_BACKOFF_SECONDS = float(os.getenv("USERINFO_RETRY_BACKOFF_SECONDS", 0.1))
+USERINFO_BREAKER_FAILURE_RATE = float(os.getenv("USERINFO_BREAKER_FAILURE_RATE", 0.5))
+USERINFO_BREAKER_MIN_CALLS = int(os.getenv("USERINFO_BREAKER_MIN_CALLS", 10))
+USERINFO_BREAKER_COOLDOWN_SECONDS = float(os.getenv("USERINFO_BREAKER_COOLDOWN_SECONDS", 30))
+USERINFO_HEDGE = os.getenv("USERINFO_HEDGE", "false").lower() == "true"
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def is_retryable_userinfo_error(e: Exception) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(e, httpx.TransportError)
+
+userinfo_upstream = ResilientCaller(
+    is_retryable=is_retryable_userinfo_error,
+    max_attempts=USERINFO_MAX_ATTEMPTS,
+    backoff_base=USERINFO_RETRY_BACKOFF_SECONDS,
+    breaker=CircuitBreaker(
+        failure_rate=USERINFO_BREAKER_FAILURE_RATE,
+        min_calls=USERINFO_BREAKER_MIN_CALLS,
+        cooldown=USERINFO_BREAKER_COOLDOWN_SECONDS,
+    ),
+    hedge=USERINFO_HEDGE,
+)
+
+async def request_user_info(access_token: str) -> dict:
+    async with userinfo_semaphore:
+        response = await http_client.get(USERINFO_ENDPOINT, headers={"Authorization": f"Bearer {access_token}"})
+    response.raise_for_status()
+    return response.json()
+
+async def fetch_user_info(access_token: str) -> dict:
+    """
+    Calls the userinfo endpoint with the access token and returns the decoded response.
+
+    Raises:
+        httpx.HTTPStatusError: If the endpoint returns an error status.
+        httpx.TimeoutException: If the endpoint does not answer within the configured timeouts.
+        CircuitOpenError: If the userinfo endpoint has been failing and is not being called.
+    """
+    return await userinfo_upstream.call(lambda: request_user_info(access_token))
+
+# Concurrent tool calls for the same token (e.g. when Gemini Enterprise fans out several calls for one user) share
+# a single upstream request rather than each calling the userinfo endpoint.
+upstream_calls = SingleFlight()
+
+async def load_user_info(access_token: str, cache_key: str) -> dict:
+    """
+    Fetches user info for the token and stores it in the userinfo cache.
+    """
+    user_info = await fetch_user_info(access_token)
+    userinfo_cache.set(cache_key, user_info, ttl=token_remaining_lifetime(access_token))
+    logger.info(f">>> 🛠️ Tool: Successfully retrieved user info: {user_info}")
+    return user_info
+
+# --- Local JWT Verification ---
+# When AUTH_VERIFY_JWT is enabled, JWT bearer tokens (Google ID tokens starting with "eyJ") are verified in the
+# middleware against Google's signing keys, which are fetched once and cached. Opaque access tokens ("ya29.") are
+# still validated remotely by the userinfo endpoint.
+AUTH_VERIFY_JWT = os.getenv("AUTH_VERIFY_JWT", "false").lower() == "true"
+AUTH_JWT_AUDIENCES = [aud for aud in os.getenv("AUTH_JWT_AUDIENCES", "").split(",") if aud]
+AUTH_JWKS_URI = os.getenv("AUTH_JWKS_URI", GOOGLE_JWKS_URI)
+
+jwt_verifier = None
+if AUTH_VERIFY_JWT:
+    if not AUTH_JWT_AUDIENCES:
+        raise ValueError("AUTH_JWT_AUDIENCES must be set when AUTH_VERIFY_JWT is enabled.")
+    jwt_verifier = JWTVerifier(JWKSCache(AUTH_JWKS_URI, http_client), audiences=AUTH_JWT_AUDIENCES)
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    yield
+    await http_client.aclose()
 
 # --- Authentication Middleware ---
 class AuthMiddleware(Middleware):
     """
     A custom middleware to enforce bearer token authentication.
+
+    If a JWT verifier is given, JWT bearer tokens are verified locally and their claims stored in the context.
+    If a rejected token cache is given, tokens found in it are refused without further checks; `shed` counts how
+    many requests were refused this way.
     """
+    def __init__(self, jwt_verifier: Optional[JWTVerifier] = None, rejected_tokens: Optional[TTLCache] = None):
+        self.jwt_verifier = jwt_verifier
+        self.rejected_tokens = rejected_tokens
+        self.shed = 0
+
     async def on_request(self, context: MiddlewareContext, call_next):
         """
         This hook is called for every incoming request that expects a response.
@@ -47,18 +202,155 @@ class AuthMiddleware(Middleware):
             user_token.set(None)
             logger.warning(">>> 🛡️ AuthMiddleware: Malformed Authorization header. Token could not be extracted.")
             raise Exception("Unauthorized: Malformed Bearer token.")
+
+        token_hash = hash_token(token)
+        if self.rejected_tokens is not None and self.rejected_tokens.get(token_hash):
+            self.shed += 1
+            logger.warning(f">>> 🛡️ AuthMiddleware: Unauthorized. Token was recently rejected ({self.shed} requests shed).")
+            raise Exception("Unauthorized: Bearer token is invalid or expired.")
+
+        user_claims.set(None)
+        if self.jwt_verifier and token.startswith("eyJ"):
+            try:
+                user_claims.set(await self.jwt_verifier.verify(token))
+                logger.info(">>> 🛡️ AuthMiddleware: JWT bearer token verified locally.")
+            except jwt.InvalidTokenError as e:
+                logger.warning(f">>> 🛡️ AuthMiddleware: Unauthorized. JWT verification failed: {e}")
+                if self.rejected_tokens is not None:
+                    self.rejected_tokens.set(token_hash, True)
+                raise Exception("Unauthorized: Bearer token is invalid or expired.")
+            except JWKSError as e:
+                logger.error(f">>> 🛡️ AuthMiddleware: Unable to load signing keys: {e}")
+                raise Exception("Unauthorized: Bearer token could not be verified.")
         
         # If the token is valid, proceed to the next middleware or the tool itself
         return await call_next(context)
 
+# --- Admission Control Middleware ---
+# Each principal (the verified `sub` of a JWT, otherwise a hash of the bearer token) gets a token bucket of
+# RATE_LIMIT_BURST tool calls refilled at RATE_LIMIT_REQUESTS_PER_SECOND, and may have at most
+# RATE_LIMIT_MAX_IN_FLIGHT_PER_PRINCIPAL tool calls running at once. RATE_LIMIT_MAX_IN_FLIGHT caps the whole instance.
+# Only tool calls are limited: the messages a client sends to connect and discover tools (initialize, tools/list,
+# ping, notifications) are cheap and never touch the userinfo endpoint. Setting a limit to 0 disables it.
+RATE_LIMIT_REQUESTS_PER_SECOND = float(os.getenv("RATE_LIMIT_REQUESTS_PER_SECOND", 5))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 10))
+RATE_LIMIT_MAX_IN_FLIGHT_PER_PRINCIPAL = int(os.getenv("RATE_LIMIT_MAX_IN_FLIGHT_PER_PRINCIPAL", 4))
+RATE_LIMIT_MAX_IN_FLIGHT = int(os.getenv("RATE_LIMIT_MAX_IN_FLIGHT", 80))
+RATE_LIMIT_MAX_PRINCIPALS = int(os.getenv("RATE_LIMIT_MAX_PRINCIPALS", 10000))
+
+class AdmissionError(McpError):
+    """
+    Raised when a request is rejected by admission control. The error data carries a machine-readable `reason`
+    and, where known, how long the client should wait before retrying. Tool call errors reach the client as text
+    only, so both are repeated in the message.
+    """
+    def __init__(self, reason: str, message: str, retry_after: Optional[float] = None):
+        data = {"reason": reason}
+        details = f"reason: {reason}"
+        if retry_after is not None:
+            data["retry_after_seconds"] = round(retry_after, 3)
+            details += f", retry after {data['retry_after_seconds']}s"
+        super().__init__(ErrorData(code=-32000, message=f"[429 Too Many Requests]: {message} ({details})", data=data))
+
+class AdmissionMiddleware(Middleware):
+    """
+    A custom middleware that enforces per-principal rate limits and in-flight caps plus a global in-flight cap on
+    tool calls.
+
+    Tool calls over a limit are rejected immediately rather than queued. Must be added after AuthMiddleware, which
+    provides the principal.
+    """
+    def __init__(
+        self,
+        requests_per_second: float,
+        burst: int,
+        max_in_flight_per_principal: int,
+        max_in_flight: int,
+        max_principals: int = RATE_LIMIT_MAX_PRINCIPALS,
+    ):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_in_flight_per_principal = max_in_flight_per_principal
+        self.max_in_flight = max_in_flight
+
+        # A bucket left idle long enough to refill completely is equivalent to a new one, so idle buckets are
+        # allowed to expire and the number of tracked principals stays bounded.
+        refill_seconds = burst / requests_per_second if requests_per_second > 0 else 0
+        self.buckets = TTLCache(max_entries=max_principals, ttl=max(refill_seconds, 60))
+        self.in_flight: dict[str, int] = {}
+        self.total_in_flight = 0
+
+        self.admitted = 0
+        self.rejected: dict[str, int] = {"rate_limited": 0, "principal_busy": 0, "server_busy": 0}
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        principal = self._principal()
+
+        if self.max_in_flight > 0 and self.total_in_flight >= self.max_in_flight:
+            self._reject("server_busy", "Server is at capacity. Please retry shortly.")
+
+        if self.max_in_flight_per_principal > 0 and self.in_flight.get(principal, 0) >= self.max_in_flight_per_principal:
+            self._reject("principal_busy", "Too many concurrent requests for this user. Please retry shortly.")
+
+        if self.requests_per_second > 0:
+            bucket = self.buckets.get(principal)
+            if bucket is None:
+                bucket = TokenBucketRateLimiter(capacity=self.burst, refill_rate=self.requests_per_second)
+            self.buckets.set(principal, bucket)
+
+            if not await bucket.consume():
+                retry_after = (1 - bucket.tokens) / self.requests_per_second
+                self._reject("rate_limited", "Rate limit exceeded for this user.", retry_after)
+
+        self.admitted += 1
+        self.total_in_flight += 1
+        self.in_flight[principal] = self.in_flight.get(principal, 0) + 1
+        try:
+            return await call_next(context)
+        finally:
+            self.total_in_flight -= 1
+            self.in_flight[principal] -= 1
+            if not self.in_flight[principal]:
+                del self.in_flight[principal]
+
+    def _principal(self) -> str:
+        claims = user_claims.get()
+        if claims and claims.get("sub"):
+            return claims["sub"]
+        return hash_token(user_token.get() or "")
+
+    def _reject(self, reason: str, message: str, retry_after: Optional[float] = None):
+        self.rejected[reason] += 1
+        logger.warning(f">>> 🚦 AdmissionMiddleware: Rejected tool call ({reason}).")
+        raise AdmissionError(reason, message, retry_after)
+
 # --- MCP Server Setup ---
-mcp = FastMCP("Code Snippet MCP Server")
+mcp = FastMCP("Code Snippet MCP Server", lifespan=lifespan)
 # Add the authentication middleware to the server
-mcp.add_middleware(AuthMiddleware())
+mcp.add_middleware(AuthMiddleware(jwt_verifier, rejected_tokens))
+# Add admission control after authentication so tool calls are limited per authenticated principal
+mcp.add_middleware(AdmissionMiddleware(
+    requests_per_second=RATE_LIMIT_REQUESTS_PER_SECOND,
+    burst=RATE_LIMIT_BURST,
+    max_in_flight_per_principal=RATE_LIMIT_MAX_IN_FLIGHT_PER_PRINCIPAL,
+    max_in_flight=RATE_LIMIT_MAX_IN_FLIGHT,
+))
 
 # --- Tool Definitions ---
+def format_user_info(user_info: dict) -> str:
+    name = user_info.get("name", "N/A")
+    email = user_info.get("email", "N/A")
+    picture = user_info.get("picture", "N/A")
+
+    return (
+        f"Successfully retrieved user info:\n"
+        f"- Name: {name}\n"
+        f"- Email: {email}\n"
+        f"- Picture URL: {picture}"
+    )
+
 @mcp.tool()
-def get_user_info_from_access_token(context: MiddlewareContext) -> str:
+async def get_user_info_from_access_token(context: MiddlewareContext) -> str:
     """
     Uses a Google OAuth2 Access Token to retrieve user information from the userinfo endpoint.
     """
@@ -71,47 +363,52 @@ def get_user_info_from_access_token(context: MiddlewareContext) -> str:
     if not access_token:
         return "Error: Auth token not found in the request context. The middleware may not have run correctly."
 
-    userinfo_endpoint = "https://www.googleapis.com/oauth2/v3/userinfo"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    
-    try:
-        response = requests.get(userinfo_endpoint, headers=headers)
-        response.raise_for_status()
-        
-        user_info = response.json()
-        logger.info(f">>> 🛠️ Tool: Successfully retrieved user info: {user_info}")
+    # A locally verified ID token already carries the user's profile claims.
+    claims = user_claims.get()
+    if claims:
+        return format_user_info(claims)
 
-        name = user_info.get("name", "N/A")
-        email = user_info.get("email", "N/A")
-        picture = user_info.get("picture", "N/A")
+    cache_key = hash_token(access_token)
+    user_info = userinfo_cache.get(cache_key)
 
-        return (
-            f"Successfully retrieved user info:\n"
-            f"- Name: {name}\n"
-            f"- Email: {email}\n"
-            f"- Picture URL: {picture}"
-        )
+    try:
+        if user_info is None:
+            user_info = await upstream_calls.do(
+                ("userinfo", cache_key), lambda: load_user_info(access_token, cache_key)
+            )
+        else:
+            logger.info(">>> 🛠️ Tool: Returning cached user info.")
 
-    except requests.exceptions.HTTPError as e:
+        return format_user_info(user_info)
+
+    except httpx.HTTPStatusError as e:
         logger.error(f"HTTP Error while calling userinfo endpoint: {e}")
         if e.response.status_code == 401:
+            rejected_tokens.set(cache_key, True)
             return "[401 Unauthorized]: The provided access token is invalid or expired."
         
         if e.response.status_code == 403:
             return "[403 Forbidden]: The provided access token does not have required permissions to access this resource."
         return f"Error: Failed to retrieve user info. Server returned status {e.response.status_code}."
+    except httpx.TimeoutException as e:
+        logger.error(f"Timed out while calling userinfo endpoint: {e!r}")
+        return "Error: Timed out while retrieving user info. Please try again."
+    except CircuitOpenError:
+        logger.error(f"Userinfo endpoint circuit breaker is open: {userinfo_upstream.stats()}")
+        return "Error: The user info service is temporarily unavailable. Please try again shortly."
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
         return "An unexpected error occurred on the server while retrieving user info."
 
 # --- Server Execution ---
+# The server as an ASGI app, served by shared/serve.py. MCP sessions live in the memory of the process that created them, so
+# running several worker processes (WORKERS) requires MCP_STATELESS_HTTP=true. Nothing else is shared either: each
+# worker has its own userinfo cache, negative cache, JWKS, rate limits, circuit breaker and in-flight call
+# deduplication, so a user's effective rate limit is multiplied by the number of workers.
+app = mcp.http_app(transport="streamable-http", stateless_http=stateless_http(), json_response=MCP_JSON_RESPONSE)
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8080))
     logger.info(f"🚀 MCP server started on port {port}")
-    asyncio.run(
-        mcp.run_async(
-            transport="streamable-http",
-            host="0.0.0.0",
-            port=port,
-        )
-    )
+    # This process has already built the app; with several workers each one builds its own from "main:app".
+    serve(app if worker_count() == 1 else APP, port)
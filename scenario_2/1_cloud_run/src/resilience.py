@@ -0,0 +1,228 @@
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the upstream while the circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of recent upstream calls and opens once the failure rate over the window reaches
+    `failure_rate` (given at least `min_calls` outcomes). While open, calls fail fast. After `cooldown` seconds a
+    single trial call is let through: success closes the breaker, failure opens it again.
+
+    Each allowed call gets a ticket from `allow()` and passes it back to `record()`. Tickets are tied to the breaker's
+    current state, so a call that was already running when the breaker opened or closed can't settle the trial or
+    count towards the new window; its outcome is ignored (and counted in `stale`).
+    """
+    def __init__(self, failure_rate: float = 0.5, min_calls: int = 10, window: int = 20, cooldown: float = 30):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at: Optional[float] = None
+        # Incremented on every state change and for every trial call, so only the latest tickets are current.
+        self._generation = 0
+        self._trial: Optional[int] = None
+
+        self.opened = 0
+        self.rejected = 0
+        self.stale = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> Optional[int]:
+        """
+        Returns the ticket of a call that may go ahead, or None if the call must fail fast.
+        """
+        state = self.state
+        if state == "closed":
+            return self._generation
+        if state == "half_open" and self._trial is None:
+            self._generation += 1
+            self._trial = self._generation
+            return self._trial
+        self.rejected += 1
+        return None
+
+    def abandon(self, ticket: int):
+        """
+        Releases the half-open trial slot when the trial call was cancelled before it had an outcome.
+        """
+        if ticket == self._trial:
+            self._trial = None
+
+    def record(self, ticket: int, success: bool):
+        if ticket != self._generation:
+            # The call started before the breaker last changed state.
+            self.stale += 1
+            return
+
+        if self._opened_at is not None:
+            # Outcome of the half-open trial call.
+            self._trial = None
+            self._generation += 1
+            if success:
+                self._opened_at = None
+                self._outcomes.clear()
+                logger.info(">>> 🔌 CircuitBreaker: Closed after a successful trial call.")
+            else:
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                logger.warning(">>> 🔌 CircuitBreaker: Opened again after a failed trial call.")
+            return
+
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+            self._opened_at = time.monotonic()
+            self._generation += 1
+            self.opened += 1
+            logger.warning(f">>> 🔌 CircuitBreaker: Opened after {failures}/{len(self._outcomes)} failed calls.")
+
+
+class LatencyTracker:
+    """
+    Keeps the latencies of the most recent successful calls to estimate a percentile.
+    """
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Returns the p-th percentile (0-100) of recent latencies, or None until enough samples are recorded.
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class ResilientCaller:
+    """
+    Wraps calls to an upstream with bounded retries, a circuit breaker and optional request hedging.
+
+    - Failures for which `is_retryable` returns True are retried up to `max_attempts` in total, waiting a random
+      ("full jitter") backoff of up to `backoff_base * 2 ** (attempt - 1)` seconds, capped at `backoff_max`. Only
+      retryable failures count against the circuit breaker; other errors (e.g. a 401 for a bad token) are raised
+      immediately.
+    - With `hedge` enabled, if an attempt has not finished after the p95 latency of recent calls, a second
+      identical request is sent and whichever succeeds first is used. Only use this for idempotent calls.
+    """
+    def __init__(
+        self,
+        is_retryable: Callable[[Exception], bool],
+        max_attempts: int = 3,
+        backoff_base: float = 0.1,
+        backoff_max: float = 1.0,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.01,
+    ):
+        self.is_retryable = is_retryable
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyTracker()
+
+        self.retries = 0
+        self.hedges = 0
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Calls `fn`, retrying and hedging as configured.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            ticket = self.breaker.allow()
+            if ticket is None:
+                raise CircuitOpenError("Upstream circuit breaker is open.")
+
+            try:
+                result = await self._attempt(fn)
+            except asyncio.CancelledError:
+                self.breaker.abandon(ticket)
+                raise
+            except Exception as e:
+                retryable = self.is_retryable(e)
+                self.breaker.record(ticket, not retryable)
+                if not retryable or attempt == self.max_attempts:
+                    raise
+
+                self.retries += 1
+                backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                logger.warning(f">>> 🔁 ResilientCaller: Attempt {attempt} failed ({e!r}), retrying in {backoff:.3f}s.")
+                await asyncio.sleep(backoff)
+                continue
+
+            self.breaker.record(ticket, True)
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+            "breaker_rejected": self.breaker.rejected,
+            "breaker_stale": self.breaker.stale,
+        }
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        result = await fn()
+        self.latency.record(time.perf_counter() - start)
+        return result
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        p95 = self.latency.percentile(95) if self.hedge else None
+        if p95 is None:
+            return await self._timed(fn)
+
+        first = asyncio.ensure_future(self._timed(fn))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=max(p95, self.hedge_min_delay))
+            if not done:
+                self.hedges += 1
+                tasks.add(asyncio.ensure_future(self._timed(fn)))
+
+            # Use the first successful response; fail only if every request failed.
+            error = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,49 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single in-flight call.
+
+    The first caller for a key starts the call; callers that arrive while it is running wait for the same result
+    and receive the same return value or the same exception. Once the call completes the key is released, so the
+    next caller starts a fresh call.
+    """
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs `fn` unless a call for the key is already in flight, in which case its result is awaited instead.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+        else:
+            self.shared += 1
+
+        # Shield the shared call so a caller that is cancelled does not cancel it for the other waiters.
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "shared": self.shared,
+        }
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter was cancelled before it was raised.
+        if not task.cancelled():
+            task.exception()
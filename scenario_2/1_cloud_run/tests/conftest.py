@@ -0,0 +1,84 @@
+import time
+import threading
+
+import httpx
+import pytest
+import uvicorn
+
+import main
+from fake_google import create_app
+
+# The tests call the fake Google endpoints in process, through an ASGI transport, rather than over the network.
+FAKE_GOOGLE_URL = "http://fake-google"
+JWKS_URI = f"{FAKE_GOOGLE_URL}/oauth2/v3/certs"
+USERINFO_ENDPOINT = f"{FAKE_GOOGLE_URL}/oauth2/v3/userinfo"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def fake_google_client():
+    """
+    Returns a function that creates an HTTP client for fake Google endpoints with the given latency and faults (see
+    fake_google.create_app). The endpoints accept any bearer token. The clients are closed after the test.
+    """
+    clients = []
+
+    def client(latency: float = 0.0, **faults) -> httpx.AsyncClient:
+        app = create_app(latency=latency, accept_any_token=True, **faults)
+        clients.append(httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=FAKE_GOOGLE_URL))
+        return clients[-1]
+
+    yield client
+    for c in clients:
+        await c.aclose()
+
+
+@pytest.fixture
+def fake_google():
+    """
+    Fake Google endpoints that only accept the access tokens they issued.
+    """
+    return create_app(latency=0.0)
+
+
+@pytest.fixture
+async def issue_access_token(fake_google):
+    """
+    Returns a function that gets a new access token for the fake user from fake_google's token endpoint.
+    """
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_google), base_url=FAKE_GOOGLE_URL) as client:
+
+        async def issue() -> str:
+            response = await client.post("/token", data={"grant_type": "refresh_token", "refresh_token": "fake"})
+            response.raise_for_status()
+            return response.json()["access_token"]
+
+        yield issue
+
+
+@pytest.fixture
+def mcp_server(monkeypatch, fake_google):
+    """
+    Serves the MCP server over HTTP on a free local port, calling fake_google in process, and returns its MCP endpoint
+    URL. Module state (caches, rate limits) is shared with the other tests.
+    """
+    userinfo_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_google))
+    monkeypatch.setattr(main, "http_client", userinfo_client)
+    monkeypatch.setattr(main, "USERINFO_ENDPOINT", USERINFO_ENDPOINT)
+
+    # A new app for each test: an app's session manager can only be run once.
+    app = main.mcp.http_app(transport="streamable-http", stateless_http=main.stateless_http(), json_response=main.MCP_JSON_RESPONSE)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/mcp"
+    server.should_exit = True
+    thread.join()
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from fastmcp import Client
+from fastmcp.client.transports import StreamableHttpTransport
+from fastmcp.exceptions import ToolError
+
+import main
+from fake_google import FAKE_USER
+
+pytestmark = pytest.mark.anyio
+
+# The tool's `context` parameter is part of its input schema, so clients must pass one.
+TOOL_ARGS = {"context": {"message": {}}}
+
+
+def admission() -> main.AdmissionMiddleware:
+    return next(middleware for middleware in main.mcp.middleware if isinstance(middleware, main.AdmissionMiddleware))
+
+
+def client(url: str, token: str) -> Client:
+    return Client(StreamableHttpTransport(url, headers={"Authorization": f"Bearer {token}"}))
+
+
+async def connect_and_call(url: str, token: str) -> str:
+    async with client(url, token) as session:
+        await session.ping()
+        tools = await session.list_tools()
+        assert [tool.name for tool in tools] == ["get_user_info_from_access_token"]
+        result = await session.call_tool("get_user_info_from_access_token", TOOL_ARGS)
+        return result.content[0].text
+
+
+async def test_clients_connect_list_and_call_under_default_limits(mcp_server, issue_access_token):
+    # Five clients of one user connecting at once send far more MCP messages than the burst allows, but only their
+    # five tool calls count.
+    token = await issue_access_token()
+    rejected = dict(admission().rejected)
+
+    results = await asyncio.gather(*(connect_and_call(mcp_server, token) for _ in range(5)))
+
+    assert all(FAKE_USER["email"] in result for result in results)
+    assert admission().rejected == rejected
+
+
+async def test_tool_calls_over_the_burst_are_rate_limited(mcp_server, issue_access_token):
+    async with client(mcp_server, await issue_access_token()) as session:
+        # The bucket refills while the calls run, so a few more than the burst may get through.
+        admitted = 0
+        with pytest.raises(ToolError, match="reason: rate_limited"):
+            for _ in range(2 * main.RATE_LIMIT_BURST):
+                await session.call_tool("get_user_info_from_access_token", TOOL_ARGS)
+                admitted += 1
+        assert admitted >= main.RATE_LIMIT_BURST
+
+        # Listing tools is still admitted.
+        assert await session.list_tools()
@@ -0,0 +1,125 @@
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+import fake_google
+import main
+from cache import TTLCache
+from conftest import JWKS_URI
+from fake_google import FAKE_USER, mint_id_token
+from jwt_verifier import JWKSCache, JWKSError, JWTVerifier
+
+pytestmark = pytest.mark.anyio
+
+AUDIENCE = "https://user-info-mcp-server.example.com"
+
+
+def make_verifier(http_client: httpx.AsyncClient, min_refresh_interval: float = 60) -> JWTVerifier:
+    return JWTVerifier(JWKSCache(JWKS_URI, http_client, min_refresh_interval), audiences=[AUDIENCE])
+
+
+async def test_valid_token(fake_google_client):
+    verifier = make_verifier(fake_google_client())
+
+    claims = await verifier.verify(mint_id_token(AUDIENCE))
+
+    assert claims["sub"] == FAKE_USER["sub"]
+    assert claims["aud"] == AUDIENCE
+
+
+async def test_keys_are_fetched_once(fake_google_client):
+    verifier = make_verifier(fake_google_client())
+
+    for _ in range(3):
+        await verifier.verify(mint_id_token(AUDIENCE))
+
+    assert verifier.jwks.fetches == 1
+
+
+@pytest.mark.parametrize(
+    "token, error",
+    [
+        (lambda: mint_id_token("https://another-service.example.com"), jwt.InvalidAudienceError),
+        (lambda: mint_id_token(AUDIENCE, iss="https://issuer.example.com"), jwt.InvalidIssuerError),
+        (lambda: mint_id_token(AUDIENCE, lifetime=-60), jwt.ExpiredSignatureError),
+    ],
+    ids=["wrong_audience", "wrong_issuer", "expired"],
+)
+async def test_invalid_token(fake_google_client, token, error):
+    verifier = make_verifier(fake_google_client())
+
+    with pytest.raises(error):
+        await verifier.verify(token())
+
+
+async def test_unknown_key_id_refetches_keys(fake_google_client, monkeypatch):
+    verifier = make_verifier(fake_google_client(), min_refresh_interval=0)
+    await verifier.verify(mint_id_token(AUDIENCE))
+
+    # The fake rotates its signing key: the new key id is not in the cached JWKS.
+    monkeypatch.setattr(fake_google, "signing_key", rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    monkeypatch.setattr(fake_google, "KEY_ID", "rotated-key")
+    claims = await verifier.verify(mint_id_token(AUDIENCE))
+
+    assert claims["aud"] == AUDIENCE
+    assert verifier.jwks.fetches == 2
+
+
+async def test_unknown_key_id_refetches_are_rate_limited(fake_google_client):
+    verifier = make_verifier(fake_google_client(), min_refresh_interval=60)
+    await verifier.verify(mint_id_token(AUDIENCE))
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    for _ in range(3):
+        token = jwt.encode({"aud": AUDIENCE}, other_key, algorithm="RS256", headers={"kid": "made-up"})
+        with pytest.raises(jwt.InvalidTokenError, match="Unknown signing key"):
+            await verifier.verify(token)
+
+    assert verifier.jwks.fetches == 1
+
+
+def jwks_client(response: httpx.Response) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: response))
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        httpx.Response(200, json={"keys": []}),
+        httpx.Response(200, json={"keys": [{"kty": "unknown"}]}),
+        httpx.Response(200, json=["not", "a", "jwks"]),
+        httpx.Response(200, text="<html>not json</html>"),
+        httpx.Response(503, json={"error": "backend_error"}),
+    ],
+    ids=["empty", "unusable_key", "not_an_object", "not_json", "unavailable"],
+)
+async def test_unusable_jwks_raises_jwks_error(response):
+    async with jwks_client(response) as http_client:
+        with pytest.raises(JWKSError):
+            await make_verifier(http_client).verify(mint_id_token(AUDIENCE))
+
+
+async def test_middleware_rejects_token_when_keys_cannot_be_loaded(monkeypatch):
+    token = mint_id_token(AUDIENCE)
+    monkeypatch.setattr(main, "get_http_headers", lambda: {"authorization": f"Bearer {token}"})
+
+    async with jwks_client(httpx.Response(200, text="not json")) as http_client:
+        middleware = main.AuthMiddleware(make_verifier(http_client), TTLCache(max_entries=16, ttl=30))
+        with pytest.raises(Exception, match="could not be verified"):
+            await middleware.on_request(None, call_next=None)
+
+
+async def test_middleware_negative_cache_sheds_rejected_token(fake_google_client, monkeypatch):
+    token = mint_id_token(AUDIENCE, lifetime=-60)
+    monkeypatch.setattr(main, "get_http_headers", lambda: {"authorization": f"Bearer {token}"})
+    verifier = make_verifier(fake_google_client())
+    middleware = main.AuthMiddleware(verifier, TTLCache(max_entries=16, ttl=30))
+
+    for _ in range(3):
+        with pytest.raises(Exception, match="invalid or expired"):
+            await middleware.on_request(None, call_next=None)
+
+    # Only the first request was verified; the others were refused from the cache.
+    assert middleware.shed == 2
+    assert verifier.jwks.fetches == 1
@@ -0,0 +1,170 @@
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from main import is_retryable_userinfo_error
+from resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+
+pytestmark = pytest.mark.anyio
+
+
+async def get_user_info(client: httpx.AsyncClient) -> dict:
+    response = await client.get("/oauth2/v3/userinfo", headers={"Authorization": "Bearer ya29.test"})
+    response.raise_for_status()
+    return response.json()
+
+
+def make_caller(min_calls: int = 5, cooldown: float = 30, **kwargs) -> ResilientCaller:
+    return ResilientCaller(
+        is_retryable=is_retryable_userinfo_error,
+        backoff_base=0.001,
+        breaker=CircuitBreaker(failure_rate=0.5, min_calls=min_calls, cooldown=cooldown),
+        **kwargs,
+    )
+
+
+async def fail(caller: ResilientCaller, client: httpx.AsyncClient, times: int):
+    for _ in range(times):
+        with pytest.raises(httpx.HTTPStatusError):
+            await caller.call(lambda: get_user_info(client))
+
+
+async def test_retries_retryable_errors(fake_google_client):
+    failing, healthy = fake_google_client(error_rate=1.0), fake_google_client()
+    clients = iter([failing, healthy])
+    caller = make_caller(max_attempts=3)
+
+    user_info = await caller.call(lambda: get_user_info(next(clients)))
+
+    assert user_info["sub"]
+    assert caller.retries == 1
+
+
+async def test_opens_after_failures_and_fails_fast(fake_google_client):
+    failing = fake_google_client(error_rate=1.0)
+    caller = make_caller(max_attempts=1, min_calls=5)
+
+    await fail(caller, failing, 5)
+    assert caller.breaker.state == "open"
+
+    upstream_calls = 0
+
+    async def counted():
+        nonlocal upstream_calls
+        upstream_calls += 1
+        return await get_user_info(failing)
+
+    with pytest.raises(CircuitOpenError):
+        await caller.call(counted)
+    assert upstream_calls == 0
+    assert caller.breaker.rejected == 1
+
+
+async def test_closes_after_cooldown_and_successful_trial(fake_google_client):
+    failing, healthy = fake_google_client(error_rate=1.0), fake_google_client()
+    caller = make_caller(max_attempts=1, cooldown=0.05)
+
+    await fail(caller, failing, 5)
+    await asyncio.sleep(0.06)
+    assert caller.breaker.state == "half_open"
+
+    await caller.call(lambda: get_user_info(healthy))
+    assert caller.breaker.state == "closed"
+
+
+async def test_failed_trial_reopens(fake_google_client):
+    failing = fake_google_client(error_rate=1.0)
+    caller = make_caller(max_attempts=1, cooldown=0.05)
+
+    await fail(caller, failing, 5)
+    await asyncio.sleep(0.06)
+    assert caller.breaker.opened == 1
+    await fail(caller, failing, 1)
+
+    assert caller.breaker.state == "open"
+    assert caller.breaker.opened == 2
+
+
+async def test_half_open_lets_a_single_trial_through(fake_google_client):
+    failing, slow = fake_google_client(error_rate=1.0), fake_google_client(latency=0.2)
+    caller = make_caller(max_attempts=1, cooldown=0.05)
+
+    await fail(caller, failing, 5)
+    await asyncio.sleep(0.06)
+
+    trial = asyncio.ensure_future(caller.call(lambda: get_user_info(slow)))
+    await asyncio.sleep(0.01)
+    with pytest.raises(CircuitOpenError):
+        await caller.call(lambda: get_user_info(slow))
+
+    await trial
+    assert caller.breaker.state == "closed"
+
+
+async def test_cancelled_trial_releases_the_slot(fake_google_client):
+    failing, slow, healthy = fake_google_client(error_rate=1.0), fake_google_client(latency=1.0), fake_google_client()
+    caller = make_caller(max_attempts=1, cooldown=0.05)
+
+    await fail(caller, failing, 5)
+    await asyncio.sleep(0.06)
+    trial = asyncio.ensure_future(caller.call(lambda: get_user_info(slow)))
+    await asyncio.sleep(0.01)
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    await caller.call(lambda: get_user_info(healthy))
+    assert caller.breaker.state == "closed"
+
+
+async def test_call_started_before_opening_does_not_close_breaker(fake_google_client):
+    # 59 calls fail while one slow call is still running; the breaker opens and the slow call's late success must not
+    # be taken for the outcome of a trial.
+    failing, slow = fake_google_client(latency=0.01, error_rate=1.0), fake_google_client(latency=0.3)
+    caller = make_caller(max_attempts=1, min_calls=10)
+
+    calls = [caller.call(lambda: get_user_info(slow))] + [caller.call(lambda: get_user_info(failing)) for _ in range(59)]
+    results = await asyncio.gather(*calls, return_exceptions=True)
+
+    assert isinstance(results[0], dict)
+    assert caller.breaker.state == "open"
+    # The breaker opened on the 10th failure; the remaining 49 failures and the success arrived after that.
+    assert caller.breaker.stale == 50
+
+
+async def test_call_started_before_opening_does_not_settle_trial(fake_google_client):
+    failing, slow, healthy = fake_google_client(error_rate=1.0), fake_google_client(latency=0.3), fake_google_client(latency=0.5)
+    caller = make_caller(max_attempts=1, cooldown=0.05)
+
+    stale_call = asyncio.ensure_future(caller.call(lambda: get_user_info(slow)))
+    await fail(caller, failing, 5)
+    await asyncio.sleep(0.06)
+
+    # The trial is in flight when the stale call finishes.
+    trial = asyncio.ensure_future(caller.call(lambda: get_user_info(healthy)))
+    await asyncio.sleep(0.01)
+    await stale_call
+    assert caller.breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        await caller.call(lambda: get_user_info(healthy))
+
+    await trial
+    assert caller.breaker.state == "closed"
+
+
+async def test_hedges_slow_requests(fake_google_client):
+    fast, slow = fake_google_client(latency=0.01), fake_google_client(latency=1.0)
+    caller = make_caller(max_attempts=1, hedge=True)
+    for _ in range(20):
+        await caller.call(lambda: get_user_info(fast))
+
+    # The first request is slow; the hedge sent after the p95 latency answers first.
+    clients = iter([slow, fast])
+    start = time.perf_counter()
+    user_info = await caller.call(lambda: get_user_info(next(clients)))
+
+    assert user_info["sub"]
+    assert caller.hedges == 1
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,52 @@
+import httpx
+import pytest
+from fastmcp import Client
+from fastmcp.client.transports import StreamableHttpTransport
+from fastmcp.exceptions import ToolError
+
+import main
+from conftest import FAKE_GOOGLE_URL
+from fake_google import FAKE_USER, create_app
+
+pytestmark = pytest.mark.anyio
+
+# The tool's `context` parameter is part of its input schema, so clients must pass one.
+TOOL_ARGS = {"context": {"message": {}}}
+
+
+def auth() -> main.AuthMiddleware:
+    return next(middleware for middleware in main.mcp.middleware if isinstance(middleware, main.AuthMiddleware))
+
+
+async def get_user_info(client: httpx.AsyncClient, token: str) -> httpx.Response:
+    return await client.get("/oauth2/v3/userinfo", headers={"Authorization": f"Bearer {token}"})
+
+
+async def test_fake_userinfo_only_accepts_issued_tokens():
+    app = create_app(latency=0.0, revoked_tokens=["ya29.revoked"])
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=FAKE_GOOGLE_URL) as client:
+        response = await client.post("/token", data={"grant_type": "refresh_token", "refresh_token": "fake"})
+        token = response.json()["access_token"]
+
+        assert (await get_user_info(client, token)).json() == FAKE_USER
+        assert (await get_user_info(client, "ya29.never-issued")).status_code == 401
+        assert (await get_user_info(client, "ya29.revoked")).status_code == 401
+
+        await client.post("/revoke", params={"token": token})
+        assert (await get_user_info(client, token)).status_code == 401
+
+
+async def test_rejected_token_is_shed_without_calling_userinfo(mcp_server):
+    transport = StreamableHttpTransport(mcp_server, headers={"Authorization": "Bearer ya29.never-issued"})
+    async with Client(transport) as session:
+        # Clients list the tools before calling one, as the agents do.
+        await session.list_tools()
+        result = await session.call_tool("get_user_info_from_access_token", TOOL_ARGS)
+        assert result.content[0].text.startswith("[401 Unauthorized]")
+        assert main.rejected_tokens.get(main.hash_token("ya29.never-issued"))
+
+        # The next request with the same token is refused by the middleware from the negative cache.
+        shed = auth().shed
+        with pytest.raises(ToolError, match="invalid or expired"):
+            await session.call_tool("get_user_info_from_access_token", TOOL_ARGS)
+        assert auth().shed == shed + 1
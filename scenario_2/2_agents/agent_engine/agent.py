@@ -1,5 +1,4 @@
 import os
-import re
 import json
 import logging
 from typing import Dict
@@ -17,6 +16,10 @@ from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnecti
 
 from dotenv import load_dotenv
 
+from .shared.header_cache import MemoizedHeaderProvider
+from .shared.session_pool import create_keepalive_http_client, use_session_pool
+from .token_injection import TokenInjector
+
 # Load environment variables from the parent directory as this file
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -37,23 +40,10 @@ DYNAMIC_AUTH_INTERNAL_KEY = "oauth2_auth_code_flow.access_token" # Internal key
 # This function retrieves a token for authenticating to the Cloud Run service using the end users credentials via an auth_id 
 # registered to Gemini Enterprise. The token is used in the Authorization header when making requests to the MCP 
 # server running on Cloud Run to run tool calls as the end user.
-def dynamic_token_injection(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict]:
-    token_key = None
-    pattern = re.compile(f'' + AUTH_ID + '.*')
-
-    state_dict = tool_context.state.to_dict()
-    matched_auth = {key: value for key, value in state_dict.items() if pattern.match(key)}
-    if len(matched_auth) > 0:
-        token_key = list(matched_auth.keys())[0]
-    else:
-        logger.info("No valid tokens found")
-        return None
-    
-    access_token = tool_context.state[token_key]
-    tool_context.state[AUTH_ID] = access_token
-    logger.info(f"Token injected into tool context state under key '{AUTH_ID}': {access_token}'")
+token_injector = TokenInjector(AUTH_ID)
 
-    return None
+def dynamic_token_injection(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict]:
+    return token_injector.before_tool_callback(tool, args, tool_context)
 
 def mcp_header_provider(readonly_context: ReadonlyContext) -> dict[str, str]:
     token = readonly_context.state.get(AUTH_ID)
@@ -69,17 +59,36 @@ def mcp_header_provider(readonly_context: ReadonlyContext) -> dict[str, str]:
         "Cache-Control": "no-cache"
     }
 
+def current_token(readonly_context: ReadonlyContext) -> str | None:
+    return readonly_context.state.get(AUTH_ID)
+
+# The MCP requests of one agent turn share their headers: they are built once per invocation and rebuilt only when a
+# different token has been injected or the token is about to expire.
+memoized_header_provider = MemoizedHeaderProvider(mcp_header_provider, token_version=current_token)
+
 def mcp_logger(log_statement: str):
     logger.info(f"[McpToolset] {log_statement}", exc_info=True)
 
 cloud_run_mcp = McpToolset(
     connection_params=StreamableHTTPConnectionParams(
         url=MCP_SERVER_URL,
+        httpx_client_factory=create_keepalive_http_client,
     ),
-    header_provider=mcp_header_provider,
+    header_provider=memoized_header_provider,
     errlog=mcp_logger,
 )
 
+# Each end user calls the MCP server with their own token, so initialized MCP sessions are pooled per user (keyed by
+# a hash of the Authorization header) and reused across that user's requests instead of being set up every time.
+MCP_SESSION_POOL_SIZE = int(os.getenv("MCP_SESSION_POOL_SIZE", 64))
+MCP_SESSION_IDLE_TIMEOUT_SECONDS = float(os.getenv("MCP_SESSION_IDLE_TIMEOUT_SECONDS", 300))
+
+mcp_session_pool = use_session_pool(
+    cloud_run_mcp,
+    max_sessions=MCP_SESSION_POOL_SIZE,
+    idle_timeout=MCP_SESSION_IDLE_TIMEOUT_SECONDS,
+)
+
 root_agent = LlmAgent(
     model="gemini-2.5-pro",
     name="code_snippet_agent",
@@ -0,0 +1,75 @@
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+logger = logging.getLogger(__name__)
+
+
+class TokenInjector:
+    """
+    Copies the end user's token, which Gemini Enterprise passes in session state under a key starting with the
+    authorization resource's `auth_id`, to the `auth_id` key the MCP header provider reads.
+
+    It plugs into an agent as a before tool callback. The state key holding the token is found once per session, by
+    matching the keys against a pattern compiled when the injector is created, and remembered for the session's later
+    tool calls. The remembered key is looked up directly, and only if it has disappeared from state are the keys matched
+    again. At most `max_sessions` sessions are remembered, evicting the least recently used.
+
+    The token is written to state only when it differs from the one already there: every write is recorded in the
+    event's state delta and persisted with the session.
+    """
+    def __init__(self, auth_id: str, max_sessions: int = 1024):
+        self.auth_id = auth_id
+        self.max_sessions = max_sessions
+        self._pattern = re.compile(auth_id + ".*")
+        self._token_keys: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.scans = 0
+        self.writes = 0
+
+    def before_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict]:
+        state = tool_context.state
+        session_id = tool_context.session.id
+
+        with self._lock:
+            token_key = self._token_keys.get(session_id)
+            if token_key is not None:
+                self._token_keys.move_to_end(session_id)
+
+        if token_key is not None and token_key in state:
+            self.hits += 1
+        else:
+            self.scans += 1
+            token_key = self._find_token_key(tool_context.session.state)
+            if token_key is None:
+                logger.info("No valid tokens found")
+                return None
+            with self._lock:
+                self._token_keys[session_id] = token_key
+                while len(self._token_keys) > self.max_sessions:
+                    self._token_keys.popitem(last=False)
+
+        access_token = state[token_key]
+        if token_key != self.auth_id and state.get(self.auth_id) != access_token:
+            state[self.auth_id] = access_token
+            self.writes += 1
+            logger.info(f"Token injected into tool context state under key '{self.auth_id}'")
+        return None
+
+    def stats(self) -> dict[str, int]:
+        return {"sessions": len(self._token_keys), "hits": self.hits, "scans": self.scans, "writes": self.writes}
+
+    def _find_token_key(self, session_state: Dict[str, Any]) -> Optional[str]:
+        # Iterates the session's own state dict rather than a copy. The key the token is injected under matches the
+        # pattern too; it is only the source when Gemini Enterprise used exactly the auth_id.
+        for key in session_state:
+            if key != self.auth_id and self._pattern.match(key):
+                return key
+        return self.auth_id if self.auth_id in session_state else None
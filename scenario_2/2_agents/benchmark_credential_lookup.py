@@ -0,0 +1,85 @@
+import os
+import time
+import logging
+import argparse
+from types import MappingProxyType, SimpleNamespace
+
+from google.adk.auth import AuthCredential, AuthCredentialTypes, OAuth2Auth
+
+from local.agent import auth_config, current_token, mcp_header_provider
+from local.credential_resolver import CredentialResolver
+from local.shared.header_cache import MemoizedHeaderProvider
+
+# Measures how long the local agent's header provider takes to find the end user's access token in sessions holding
+# thousands of state keys: the previous full scan of session state against the CredentialResolver, and the later
+# requests of an invocation, whose headers the MemoizedHeaderProvider reuses after checking the token. Log records are formatted and written to
+# os.devnull so the scan's per-key logging is included in its cost.
+# run: uv run python benchmark_credential_lookup.py
+logger = logging.getLogger("benchmark")
+
+def scan_session_state(readonly_context) -> str | None:
+    # The lookup get_access_token used before the CredentialResolver.
+    session_state = dict(readonly_context.session.state)
+    logger.info(f"session state keys: {list(session_state.keys())}")
+    for key, value in session_state.items():
+        logger.info(f"Inspecting session state \n key: {key}, \n value: {value}, \n type: {type(value)}")
+        if isinstance(value, AuthCredential) and value.auth_type == AuthCredentialTypes.OPEN_ID_CONNECT and value.oauth2:
+            if value.oauth2.access_token:
+                return value.oauth2.access_token
+        if isinstance(value, str) and (value.startswith("eyJ") or value.startswith("ya29.")):
+            return value
+        if isinstance(value, dict):
+            if "access_token" in value:
+                token = value["access_token"]
+                if isinstance(token, str) and (token.startswith("eyJ") or token.startswith("ya29.")):
+                    return token
+            else:
+                logger.info(f"Inspecting dict key '{key}': {list(value.keys())}")
+    return None
+
+def session_state(keys: int) -> dict:
+    state = {}
+    for i in range(keys):
+        state[f"app:setting_{i}"] = {"value": i, "label": f"setting {i}"} if i % 2 else f"value {i}"
+    # ADK stores the credential when the user completes the OAuth flow, after the state that was already there.
+    state["temp:" + auth_config.credential_key] = AuthCredential(
+        auth_type=AuthCredentialTypes.OPEN_ID_CONNECT,
+        oauth2=OAuth2Auth(client_id="client-id", access_token="ya29.benchmark-token"),
+    )
+    return state
+
+def context(state: dict, invocation_id: str):
+    # The parts of a ReadonlyContext the lookups use.
+    return SimpleNamespace(
+        invocation_id=invocation_id,
+        state=MappingProxyType(state),
+        session=SimpleNamespace(state=state),
+    )
+
+def memoized_token(provider: MemoizedHeaderProvider):
+    return lambda ctx: provider(ctx)["Authorization"].removeprefix("Bearer ")
+
+def measure(lookup, contexts) -> float:
+    start = time.perf_counter()
+    for ctx in contexts:
+        assert lookup(ctx) == "ya29.benchmark-token"
+    return (time.perf_counter() - start) / len(contexts)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the session state scan with the CredentialResolver.")
+    parser.add_argument("--keys", default="10,1000,5000,10000", help="Comma-separated session state sizes.")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    logging.basicConfig(level=logging.INFO, handlers=[handler], force=True)
+
+    print(f"{'state keys':>10} {'scan us':>12} {'resolver us':>12} {'headers us':>12}")
+    for keys in (int(k) for k in args.keys.split(",")):
+        state = session_state(keys)
+        resolver = CredentialResolver(auth_config)
+        scan = measure(scan_session_state, [context(state, "scan")] * max(1, args.iterations // 10))
+        first = measure(resolver.get_access_token, [context(state, f"invocation-{i}") for i in range(args.iterations)])
+        provider = MemoizedHeaderProvider(mcp_header_provider, token_version=current_token)
+        memoized = measure(memoized_token(provider), [context(state, "invocation-0")] * args.iterations)
+        print(f"{keys:>10} {scan * 1e6:>12.1f} {first * 1e6:>12.1f} {memoized * 1e6:>12.1f}")
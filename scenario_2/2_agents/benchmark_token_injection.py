@@ -0,0 +1,75 @@
+import re
+import json
+import time
+import logging
+import argparse
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.tools.tool_context import ToolContext
+
+from agent_engine.agent import AUTH_ID, root_agent
+from agent_engine.token_injection import TokenInjector
+
+# Measures the Agent Engine agent's before tool callback, which copies the end user's token to the state key the MCP
+# header provider reads: the previous implementation (a full state copy and regex match per call, and a state write
+# every time) against the TokenInjector. Reports the callback's time per tool call and the state delta it adds to the
+# tool call's event, which the session service persists, for sessions holding a growing number of state keys.
+# run: uv run python benchmark_token_injection.py
+# The key Gemini Enterprise passes the token under only needs to start with the auth_id.
+TOKEN_KEY = f"{AUTH_ID}_access_token"
+TOKEN = "ya29." + "x" * 250
+
+def previous_token_injection(tool, args, tool_context):
+    # dynamic_token_injection before the TokenInjector, without its log line.
+    pattern = re.compile(f'' + AUTH_ID + '.*')
+    state_dict = tool_context.state.to_dict()
+    matched_auth = {key: value for key, value in state_dict.items() if pattern.match(key)}
+    if len(matched_auth) > 0:
+        token_key = list(matched_auth.keys())[0]
+    else:
+        return None
+    tool_context.state[AUTH_ID] = tool_context.state[token_key]
+    return None
+
+def session(keys: int) -> Session:
+    state = {f"app:setting_{i}": f"value {i}" for i in range(keys)}
+    state[TOKEN_KEY] = TOKEN
+    return Session(id="session", app_name="benchmark", user_id="user", state=state)
+
+def measure(callback, keys: int, invocations: int, calls: int) -> tuple[float, int, int]:
+    # Runs `calls` tool calls in each of `invocations` agent turns of one session; returns the mean callback time and
+    # the state delta keys and bytes added per tool call.
+    session_ = session(keys)
+    elapsed, delta_keys, delta_bytes = 0.0, 0, 0
+    for i in range(invocations):
+        invocation = InvocationContext(
+            session_service=InMemorySessionService(), invocation_id=f"invocation-{i}", agent=root_agent, session=session_
+        )
+        for j in range(calls):
+            tool_context = ToolContext(invocation, function_call_id=f"call-{i}-{j}")
+            start = time.perf_counter()
+            callback(None, {}, tool_context)
+            elapsed += time.perf_counter() - start
+            state_delta = tool_context.actions.state_delta
+            delta_keys += len(state_delta)
+            delta_bytes += len(json.dumps(state_delta)) if state_delta else 0
+    total = invocations * calls
+    return elapsed / total, delta_keys / total, delta_bytes / total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the previous token injection callback with the TokenInjector.")
+    parser.add_argument("--keys", default="10,1000,10000", help="Comma-separated session state sizes.")
+    parser.add_argument("--invocations", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=5, help="Tool calls per invocation.")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'state keys':>10} {'callback':<14} {'us/call':>10} {'delta keys/call':>16} {'delta bytes/call':>17}")
+    for keys in (int(k) for k in args.keys.split(",")):
+        for name, callback in (
+            ("previous", previous_token_injection),
+            ("TokenInjector", TokenInjector(AUTH_ID).before_tool_callback),
+        ):
+            seconds, delta_keys, delta_bytes = measure(callback, keys, args.invocations, args.calls)
+            print(f"{keys:>10} {name:<14} {seconds * 1e6:>10.1f} {delta_keys:>16.2f} {delta_bytes:>17.1f}")
@@ -18,6 +18,9 @@ from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnecti
 
 from dotenv import load_dotenv
 
+from .credential_resolver import CredentialResolver
+from .shared.header_cache import MemoizedHeaderProvider
+
 # Load environment variables from the same directory as this file
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -29,6 +32,11 @@ CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "MCP SERVER URL NOT SET")
 
+# Google's OAuth endpoints. Override them to run the OAuth flow against a local stand-in such as
+# 1_cloud_run/fake_google.py.
+AUTHORIZATION_URL = os.getenv("AUTHORIZATION_URL", "https://accounts.google.com/o/oauth2/auth")
+TOKEN_URI = os.getenv("TOKEN_URI", "https://oauth2.googleapis.com/token")
+
 # Define the OAuth2 authentication scheme for OpenID Connect with Google as the provider. The token returned
 # by this flow will be used to provide the MCP server headers it can use to make authorization decisions based 
 # on the authenticated user's identity and permissions. The scopes defined here specify the level of access the 
@@ -37,9 +45,9 @@ MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "MCP SERVER URL NOT SET")
 auth_scheme = OAuth2(
     flows=OAuthFlows(
         authorizationCode=OAuthFlowAuthorizationCode(
-            authorizationUrl="https://accounts.google.com/o/oauth2/auth",
-            tokenUrl="https://oauth2.googleapis.com/token",
-            refreshUrl="https://oauth2.googleapis.com/token",
+            authorizationUrl=AUTHORIZATION_URL,
+            tokenUrl=TOKEN_URI,
+            refreshUrl=TOKEN_URI,
             scopes={
                 "https://www.googleapis.com/auth/cloud-platform": "Cloud platform scope",
                 "https://www.googleapis.com/auth/userinfo.email": "Email access scope",
@@ -59,45 +67,20 @@ auth_credential = AuthCredential(
     ),
 )
 
+# The same config the McpToolset builds from auth_scheme and auth_credential, so its credential_key is the state key
+# ADK stores the end user's credential under.
 auth_config = AuthConfig(
     auth_scheme=auth_scheme,
-    auth_credential=auth_credential
+    raw_auth_credential=auth_credential
 )
 
-def get_access_token(readonly_context: ReadonlyContext) -> str | None:
+credential_resolver = CredentialResolver(auth_config)
 
-    if hasattr(readonly_context, "session") and hasattr(readonly_context.session, "state"):
-        session_state = dict(readonly_context.session.state)
-        logger.info(f"session state keys: {list(session_state.keys())}")
-        
-        for key, value in session_state.items():
-            logger.info(f"Inspecting session state \n key: {key}, \n value: {value}, \n type: {type(value)}")
-
-            # Check for AuthCredential object with OpenID Connect [:10]
-            if isinstance(value, AuthCredential) and value.auth_type == AuthCredentialTypes.OPEN_ID_CONNECT and value.oauth2:
-                if value.oauth2.access_token:
-                    logger.info(f"\n\nFound access_token in AuthCredential object in session state key: \n   * key: {key} \n   * token: {value.oauth2.access_token}\n\n")
-                    return value.oauth2.access_token
-
-            # Direct string token check
-            if isinstance(value, str) and (value.startswith("eyJ") or value.startswith("ya29.")):
-                # Log only the beginning of the token for security
-                logger.info(f"Found token in session state key: {key}, token: {value[:10]}...") 
-                return value
-            
-            # Dictionary check for nested tokens (e.g., in case of a more complex session structure)
-            if isinstance(value, dict):
-                if "access_token" in value:
-                    token = value["access_token"]
-                    if isinstance(token, str) and (token.startswith("eyJ") or token.startswith("ya29.")):
-                        logger.info(f"Found nested token in key: {key}, token: {token[:10]}...")
-                        return token
-                else:
-                    # print dictionary keys
-                    logger.info(f"Inspecting dict key '{key}': {list(value.keys())}")
-
-    logger.info("No token found in session state.")
-    return None
+def get_access_token(readonly_context: ReadonlyContext) -> str | None:
+    token = credential_resolver.get_access_token(readonly_context)
+    if token is None:
+        logger.info("No token found in session state.")
+    return token
 
 def mcp_header_provider(readonly_context: ReadonlyContext) -> dict[str, str]:
     token = get_access_token(readonly_context)
@@ -112,6 +95,14 @@ def mcp_header_provider(readonly_context: ReadonlyContext) -> dict[str, str]:
         "Cache-Control": "no-cache"
     }
 
+def current_token(readonly_context: ReadonlyContext) -> str | None:
+    return credential_resolver.resolve(readonly_context.state)
+
+# The MCP requests of one agent turn share their headers: they are built once per invocation and rebuilt only when ADK
+# has stored a different credential or the token is about to expire. This is the only memoization layer; the token is
+# always read from the current session state, so rebuilt headers carry the new credential.
+memoized_header_provider = MemoizedHeaderProvider(mcp_header_provider, token_version=current_token)
+
 def mcp_logger(log_statement: str):
     logger.info(f"[McpToolset] {log_statement}", exc_info=True)
 
@@ -119,7 +110,7 @@ cloud_run_mcp = McpToolset(
     connection_params=StreamableHTTPConnectionParams(
         url=MCP_SERVER_URL,
     ),
-    header_provider=mcp_header_provider,
+    header_provider=memoized_header_provider,
     auth_scheme=auth_scheme,
     auth_credential=auth_credential,
     errlog=mcp_logger
@@ -0,0 +1,51 @@
+import logging
+from typing import Any, Mapping, Optional
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.auth import AuthConfig, AuthCredential
+
+logger = logging.getLogger(__name__)
+
+# Raw tokens some callers put in session state directly: Google OAuth access tokens and JWTs (e.g. ID tokens).
+TOKEN_PREFIXES = ("ya29.", "eyJ")
+
+
+def _token_of(value: Any) -> Optional[str]:
+    # A credential is an AuthCredential while the session is in memory, and its JSON form once a session service has
+    # persisted and reloaded the state.
+    if isinstance(value, AuthCredential):
+        return value.oauth2.access_token if value.oauth2 else None
+    if isinstance(value, dict):
+        oauth2 = value.get("oauth2")
+        token = oauth2.get("access_token") if isinstance(oauth2, dict) else value.get("access_token")
+        return token if isinstance(token, str) and token else None
+    if isinstance(value, str) and value.startswith(TOKEN_PREFIXES):
+        return value
+    return None
+
+
+class CredentialResolver:
+    """
+    Finds the end user's OAuth access token in session state without scanning it.
+
+    ADK stores the credential it obtains for a toolset under a key derived from the toolset's AuthConfig: the auth
+    response is stored under `temp:<credential_key>`, and a session state credential service saves it under
+    `<credential_key>`. The resolver computes those keys once and reads only them, so a lookup is a couple of dict reads
+    however many keys the session holds. `extra_keys` adds further state keys to check, in order.
+
+    Lookups are not memoized: the token is read from the current state every time, so a credential ADK stores in the
+    middle of a turn is used by that turn's next request. Memoizing the headers built from it is left to the header
+    provider (see MemoizedHeaderProvider).
+    """
+    def __init__(self, auth_config: AuthConfig, extra_keys: tuple[str, ...] = ()):
+        self.keys = ("temp:" + auth_config.credential_key, auth_config.credential_key, *extra_keys)
+
+    def get_access_token(self, readonly_context: ReadonlyContext) -> Optional[str]:
+        return self.resolve(readonly_context.state)
+
+    def resolve(self, state: Mapping[str, Any]) -> Optional[str]:
+        for key in self.keys:
+            token = _token_of(state.get(key))
+            if token is not None:
+                return token
+        return None
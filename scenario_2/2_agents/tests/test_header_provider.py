@@ -0,0 +1,66 @@
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.auth import AuthCredential, AuthCredentialTypes, OAuth2Auth
+from google.adk.sessions import InMemorySessionService, Session
+
+from local.agent import auth_config, current_token, mcp_header_provider, root_agent
+from local.shared.header_cache import MemoizedHeaderProvider
+
+CREDENTIAL_KEY = "temp:" + auth_config.credential_key
+
+
+def credential(access_token: str) -> AuthCredential:
+    return AuthCredential(
+        auth_type=AuthCredentialTypes.OPEN_ID_CONNECT,
+        oauth2=OAuth2Auth(client_id="client-id", access_token=access_token),
+    )
+
+
+def readonly_context(session: Session, invocation_id: str = "invocation-0") -> ReadonlyContext:
+    invocation = InvocationContext(
+        session_service=InMemorySessionService(), invocation_id=invocation_id, agent=root_agent, session=session
+    )
+    return ReadonlyContext(invocation)
+
+
+def make_provider() -> MemoizedHeaderProvider:
+    return MemoizedHeaderProvider(mcp_header_provider, token_version=current_token)
+
+
+def test_headers_memoized_within_invocation():
+    session = Session(id="session", app_name="test", user_id="user", state={CREDENTIAL_KEY: credential("ya29.first")})
+    provider = make_provider()
+    ctx = readonly_context(session)
+
+    first = provider(ctx)
+    second = provider(ctx)
+
+    assert first["Authorization"] == "Bearer ya29.first"
+    assert second is first
+    assert provider.provider_calls == 1
+
+
+def test_token_changed_within_invocation():
+    session = Session(id="session", app_name="test", user_id="user", state={CREDENTIAL_KEY: credential("ya29.first")})
+    provider = make_provider()
+    ctx = readonly_context(session)
+    assert provider(ctx)["Authorization"] == "Bearer ya29.first"
+
+    # ADK stores a new credential in the middle of the turn, e.g. after the user re-authorized.
+    session.state[CREDENTIAL_KEY] = credential("ya29.second")
+
+    assert provider(ctx)["Authorization"] == "Bearer ya29.second"
+    assert provider(ctx)["Authorization"] == "Bearer ya29.second"
+    assert provider.invalidations == 1
+    assert provider.provider_calls == 2
+
+
+def test_new_invocation_builds_headers():
+    session = Session(id="session", app_name="test", user_id="user", state={CREDENTIAL_KEY: credential("ya29.first")})
+    provider = make_provider()
+    provider(readonly_context(session, "invocation-0"))
+
+    session.state[CREDENTIAL_KEY] = credential("ya29.second")
+
+    assert provider(readonly_context(session, "invocation-1"))["Authorization"] == "Bearer ya29.second"
+    assert provider.provider_calls == 2
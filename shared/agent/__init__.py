@@ -0,0 +1,7 @@
+"""
+Modules shared by the scenario 1 and scenario 2 agents.
+
+Each agent folder links this package in as `shared` (e.g. `scenario_1/2_agents/local/shared`) and imports it relatively,
+so `adk web` loads it from the link and `adk deploy agent_engine`, which copies the agent folder with its links
+resolved, ships a copy with the agent.
+"""
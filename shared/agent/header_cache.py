@@ -0,0 +1,127 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+import google.auth.jwt
+from google.adk.agents.readonly_context import ReadonlyContext
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+
+# A memoized Authorization header is rebuilt once its JWT is within MIN_VALIDITY_SECONDS of expiring.
+MIN_VALIDITY_SECONDS = 30
+
+
+def _expires_at(headers: dict[str, str]) -> Optional[float]:
+    # The expiry of a JWT bearer token, from its `exp` claim. Opaque tokens (e.g. Google OAuth access tokens) have none.
+    authorization = headers.get("Authorization", "")
+    if not authorization.startswith("Bearer "):
+        return None
+    try:
+        return float(google.auth.jwt.decode(authorization[len("Bearer "):], verify=False)["exp"])
+    except (ValueError, KeyError):
+        return None
+
+
+@dataclass
+class _Memo:
+    headers: dict[str, str]
+    token_version: Hashable
+    expires_at: Optional[float]
+    calls: int = 0
+    provider_calls: int = 0
+
+
+class MemoizedHeaderProvider:
+    """
+    Wraps an McpToolset header provider so its headers are computed once per invocation (agent turn) and reused for
+    the turn's later MCP requests: listing tools and each tool call.
+
+    A memoized result is dropped, and the provider called again, when
+    - `token_version(readonly_context)` returns something other than when it was computed. It should be a cheap read of
+      the current token that doesn't fetch one, so a refreshed token is picked up within the turn.
+    - its bearer token is a JWT within `min_validity` seconds of expiring.
+
+    The headers of the most recent `max_invocations` invocations are kept. Requests without a context (e.g. a warmup)
+    always call the provider. The returned dict is shared by the invocation's requests and must not be modified.
+
+    The number of header requests and provider calls of each turn is recorded on the current trace span and summed in
+    `stats()`.
+    """
+    def __init__(
+        self,
+        provider: Callable[[Optional[ReadonlyContext]], dict[str, str]],
+        token_version: Optional[Callable[[ReadonlyContext], Hashable]] = None,
+        min_validity: float = MIN_VALIDITY_SECONDS,
+        max_invocations: int = 256,
+    ):
+        self.provider = provider
+        self.token_version = token_version
+        self.min_validity = min_validity
+        self.max_invocations = max_invocations
+        self._memos: OrderedDict[str, _Memo] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.provider_calls = 0
+        self.invalidations = 0
+
+    def __call__(self, readonly_context: Optional[ReadonlyContext]) -> dict[str, str]:
+        if readonly_context is None:
+            with self._lock:
+                self.calls += 1
+                self.provider_calls += 1
+            return self.provider(readonly_context)
+
+        invocation_id = readonly_context.invocation_id
+        token_version = self.token_version(readonly_context) if self.token_version else None
+        with self._lock:
+            self.calls += 1
+            memo = self._memos.get(invocation_id)
+            if memo is not None and self._is_valid(memo, token_version):
+                memo.calls += 1
+                self._memos.move_to_end(invocation_id)
+                self._export(memo)
+                return memo.headers
+
+        headers = self.provider(readonly_context)
+        with self._lock:
+            self.provider_calls += 1
+            if memo is None:
+                memo = _Memo(headers, token_version, _expires_at(headers))
+                self._memos[invocation_id] = memo
+                while len(self._memos) > self.max_invocations:
+                    self._memos.popitem(last=False)
+            else:
+                self.invalidations += 1
+                memo.headers, memo.token_version, memo.expires_at = headers, token_version, _expires_at(headers)
+            memo.calls += 1
+            memo.provider_calls += 1
+            self._memos.move_to_end(invocation_id)
+            self._export(memo)
+        return headers
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "invocations": len(self._memos),
+                "calls": self.calls,
+                "provider_calls": self.provider_calls,
+                "invalidations": self.invalidations,
+                "hit_rate": 1 - self.provider_calls / self.calls if self.calls else 0.0,
+            }
+
+    def _is_valid(self, memo: _Memo, token_version: Hashable) -> bool:
+        if memo.token_version != token_version:
+            return False
+        return memo.expires_at is None or memo.expires_at - time.time() > self.min_validity
+
+    @staticmethod
+    def _export(memo: _Memo):
+        # The counts so far in this turn, on the span of the request that asked for headers.
+        span = trace.get_current_span()
+        span.set_attribute("header_provider.calls", memo.calls)
+        span.set_attribute("header_provider.provider_calls", memo.provider_calls)
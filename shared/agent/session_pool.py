@@ -0,0 +1,314 @@
+import sys
+import time
+import asyncio
+import hashlib
+import inspect
+import logging
+import threading
+import importlib.util
+import concurrent.futures
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, TextIO, TypeVar
+
+import httpx
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+from google.adk.tools.mcp_tool.mcp_session_manager import MCPSessionManager, StreamableHTTPConnectionParams
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+from google.adk.tools.mcp_tool.session_context import SessionContext
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP/2 lets concurrent MCP requests share one connection. httpx only supports it when the optional h2 package is
+# installed; without it connections fall back to HTTP/1.1 keep-alive.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Idle connections are kept open for reuse for this long. Cloud Run closes idle connections after about 10 minutes.
+KEEPALIVE_EXPIRY_SECONDS = 300
+
+
+def create_keepalive_http_client(
+    headers: Optional[dict[str, str]] = None,
+    timeout: Optional[httpx.Timeout] = None,
+    auth: Optional[httpx.Auth] = None,
+) -> httpx.AsyncClient:
+    """
+    An httpx client factory for StreamableHTTPConnectionParams that keeps connections alive between requests and
+    uses HTTP/2 when available.
+    """
+    return httpx.AsyncClient(
+        headers=headers,
+        timeout=timeout or httpx.Timeout(30, read=300),
+        auth=auth,
+        follow_redirects=True,
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS),
+    )
+
+
+def authorization_principal(headers: Dict[str, str]) -> str:
+    """
+    Identifies the principal of a request by a hash of its Authorization header, so every caller gets its own session.
+    """
+    authorization = headers.get("Authorization") or headers.get("authorization") or ""
+    return hashlib.sha256(authorization.encode("utf-8")).hexdigest()[:16]
+
+
+class _CurrentHeaders(httpx.Auth):
+    # Applies a pooled session's latest headers to each request, so a refreshed token is used without reconnecting.
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+
+    def auth_flow(self, request: httpx.Request):
+        request.headers.update(self.headers)
+        yield request
+
+
+class _KeyLock(asyncio.Lock):
+    # A principal's lock, counting the requests that hold or wait for it so it can be dropped once unused.
+    def __init__(self):
+        super().__init__()
+        self.users = 0
+
+
+@dataclass
+class _PooledSession:
+    session: ClientSession
+    exit_stack: AsyncExitStack
+    headers: Dict[str, str]
+    last_used: float
+    last_checked: float
+
+
+class _PoolLoopSession:
+    # Stands in for a ClientSession that lives on the pool's event loop: its coroutine methods (call_tool, list_tools,
+    # read_resource, ...) run on that loop and are awaited from the caller's loop.
+    def __init__(self, session: ClientSession, loop: asyncio.AbstractEventLoop):
+        self.session = session
+        self._loop = loop
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.session, name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(attribute(*args, **kwargs), self._loop))
+
+        return call
+
+
+class PooledMCPSessionManager(MCPSessionManager):
+    """
+    A drop-in replacement for ADK's MCPSessionManager that keeps initialized MCP sessions warm per (server, principal).
+
+    ADK's session manager keys sessions by a hash of all request headers and drops a session when it is used from a
+    different event loop, so a refreshed token or a request served on a new loop pays for a new connection and MCP
+    `initialize`. Here every session lives on one background event loop, is keyed by the principal returned by
+    `principal_of`, and picks up the caller's latest headers on each request.
+
+    - Sessions unused for `idle_timeout` seconds are closed, and at most `max_sessions` are kept, evicting the least
+      recently used.
+    - A session idle for `health_check_interval` seconds is pinged before reuse and replaced if the ping fails.
+    - `warmup` opens a session ahead of the first request.
+    """
+    def __init__(
+        self,
+        connection_params: StreamableHTTPConnectionParams,
+        errlog: TextIO = sys.stderr,
+        principal_of: Callable[[Dict[str, str]], str] = authorization_principal,
+        max_sessions: int = 32,
+        idle_timeout: float = 300,
+        health_check_interval: float = 60,
+    ):
+        super().__init__(connection_params, errlog)
+        self.principal_of = principal_of
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._init_pool()
+
+    def _init_pool(self):
+        self._pool: OrderedDict[str, _PooledSession] = OrderedDict()
+        self._key_locks: Dict[str, _KeyLock] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self.health_check_failures = 0
+
+    async def create_session(self, headers: Optional[Dict[str, str]] = None) -> ClientSession:
+        session = await self._on_pool_loop(self._acquire(self._merge_headers(headers) or {}))
+        return _PoolLoopSession(session, self._pool_loop())  # type: ignore[return-value]
+
+    def warmup(self, headers: Optional[Dict[str, str]] = None) -> concurrent.futures.Future:
+        """
+        Opens and initializes the session for these headers in the background. Returns a future that completes once
+        the session is ready.
+        """
+        return asyncio.run_coroutine_threadsafe(self._acquire(self._merge_headers(headers) or {}), self._pool_loop())
+
+    async def close(self):
+        if self._loop is not None:
+            await self._on_pool_loop(self._close_all())
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "sessions": len(self._pool),
+            "created": self.created,
+            "reused": self.reused,
+            "evicted": self.evicted,
+            "health_check_failures": self.health_check_failures,
+        }
+
+    def _is_session_disconnected(self, session: ClientSession) -> bool:
+        if isinstance(session, _PoolLoopSession):
+            session = session.session
+        return super()._is_session_disconnected(session)
+
+    def _pool_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="mcp-session-pool", daemon=True).start()
+            return self._loop
+
+    async def _on_pool_loop(self, coroutine: Awaitable[T]) -> T:
+        loop = self._pool_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coroutine
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+
+    # Everything below runs on the pool's event loop.
+
+    async def _acquire(self, headers: Dict[str, str]) -> ClientSession:
+        key = self.principal_of(headers)
+        lock = self._key_locks.setdefault(key, _KeyLock())
+        lock.users += 1
+        try:
+            async with lock:
+                await self._evict_idle()
+
+                entry = self._pool.get(key)
+                if entry is not None and not await self._is_healthy(entry):
+                    self.health_check_failures += 1
+                    logger.info(f"Replacing unhealthy MCP session for principal {key}")
+                    await self._discard(key)
+                    entry = None
+
+                if entry is None:
+                    entry = await self._open(headers)
+                    self._pool[key] = entry
+                    self.created += 1
+                    while len(self._pool) > self.max_sessions:
+                        await self._discard(next(iter(self._pool)))
+                        self.evicted += 1
+                else:
+                    self.reused += 1
+
+                entry.headers.clear()
+                entry.headers.update(headers)
+                entry.last_used = time.monotonic()
+                self._pool.move_to_end(key)
+                return entry.session
+        finally:
+            lock.users -= 1
+            self._drop_unused_lock(key)
+
+    async def _open(self, headers: Dict[str, str]) -> _PooledSession:
+        params = self._connection_params
+        current_headers = dict(headers)
+        client = streamablehttp_client(
+            url=params.url,
+            timeout=timedelta(seconds=params.timeout),
+            sse_read_timeout=timedelta(seconds=params.sse_read_timeout),
+            terminate_on_close=params.terminate_on_close,
+            httpx_client_factory=params.httpx_client_factory,
+            auth=_CurrentHeaders(current_headers),
+        )
+
+        exit_stack = AsyncExitStack()
+        try:
+            session = await asyncio.wait_for(
+                exit_stack.enter_async_context(
+                    SessionContext(client=client, timeout=params.timeout, sse_read_timeout=params.sse_read_timeout)
+                ),
+                timeout=params.timeout,
+            )
+        except Exception as e:
+            await exit_stack.aclose()
+            raise ConnectionError(f"Failed to create MCP session: {e}") from e
+
+        now = time.monotonic()
+        return _PooledSession(session, exit_stack, current_headers, last_used=now, last_checked=now)
+
+    async def _is_healthy(self, entry: _PooledSession) -> bool:
+        if super()._is_session_disconnected(entry.session):
+            return False
+
+        now = time.monotonic()
+        if now - max(entry.last_used, entry.last_checked) < self.health_check_interval:
+            return True
+
+        entry.last_checked = now
+        try:
+            await asyncio.wait_for(entry.session.send_ping(), timeout=self._connection_params.timeout)
+            return True
+        except Exception as e:
+            logger.info(f"MCP session health check failed: {e!r}")
+            return False
+
+    async def _evict_idle(self):
+        now = time.monotonic()
+        for key, entry in list(self._pool.items()):
+            lock = self._key_locks.get(key)
+            if now - entry.last_used >= self.idle_timeout and (lock is None or lock.users == 0):
+                await self._discard(key)
+                self.evicted += 1
+
+    async def _discard(self, key: str):
+        entry = self._pool.pop(key, None)
+        if entry is None:
+            return
+        self._drop_unused_lock(key)
+        try:
+            await entry.exit_stack.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing MCP session for principal {key}: {e!r}")
+
+    def _drop_unused_lock(self, key: str):
+        # A principal's lock is kept while it has a pooled session or a request holds or waits for it, so the locks
+        # never outnumber the sessions plus the requests in flight.
+        lock = self._key_locks.get(key)
+        if lock is not None and lock.users == 0 and key not in self._pool:
+            del self._key_locks[key]
+
+    async def _close_all(self):
+        for key in list(self._pool):
+            await self._discard(key)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        for name in ("_pool", "_key_locks", "_loop", "_loop_lock"):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._init_pool()
+
+
+def use_session_pool(toolset: McpToolset, **options: Any) -> PooledMCPSessionManager:
+    """
+    Replaces the session manager of an McpToolset (and of the tools it creates) with a PooledMCPSessionManager.
+    """
+    session_pool = PooledMCPSessionManager(toolset._connection_params, toolset._errlog, **options)
+    toolset._mcp_session_manager = session_pool
+    return session_pool
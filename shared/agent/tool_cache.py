@@ -0,0 +1,157 @@
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    How the results of one tool are cached.
+
+    - ttl: seconds a result is served from the cache.
+    - user_scoped: results depend on who is calling (e.g. a user info tool), so they are cached per principal
+      instead of being shared by every user of the agent.
+    - normalize: maps the call arguments to the form used in the cache key, e.g. to lowercase a snippet type so
+      "SQL" and "sql" share an entry.
+    """
+    ttl: float
+    user_scoped: bool = False
+    normalize: Optional[Callable[[dict[str, Any]], dict[str, Any]]] = None
+
+
+def _map_strings(value: Any, fn: Callable[[str], str]) -> Any:
+    if isinstance(value, str):
+        return fn(value)
+    if isinstance(value, dict):
+        return {key: _map_strings(item, fn) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_map_strings(item, fn) for item in value]
+    return value
+
+
+def lowercase_strings(args: dict[str, Any]) -> dict[str, Any]:
+    """
+    A CachePolicy normalizer for tools whose string arguments are case-insensitive.
+    """
+    return _map_strings(args, str.lower)
+
+
+class ToolResultCache:
+    """
+    Caches the results of MCP tool calls in the agent process, shared across sessions.
+
+    Only tools with a CachePolicy are cached, keyed by the tool name, the principal for user-scoped tools, and the
+    normalized arguments. The cache is bounded to `max_entries` results and evicts the least recently used.
+
+    It plugs into an agent as its before and after tool callbacks: `before_tool_callback` answers a call from the
+    cache, skipping the MCP round trip, and `after_tool_callback` stores successful results. Errors are not cached.
+    """
+    def __init__(self, policies: dict[str, CachePolicy], max_entries: int = 512):
+        self.policies = policies
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, float, dict]] = OrderedDict()
+        # Cache keys and start times of the calls that missed, by function call id, until their result arrives.
+        self._pending: dict[str, tuple[Hashable, float, float]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def before_tool_callback(self, tool: BaseTool, args: dict[str, Any], tool_context: ToolContext) -> Optional[dict]:
+        policy = self.policies.get(tool.name)
+        if policy is None:
+            return None
+
+        key = self._key(tool.name, policy, args, tool_context)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry[1]
+                hit = True
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                self._pending[tool_context.function_call_id] = (key, policy.ttl, time.perf_counter())
+                # A call that failed before its after callback ran is never resolved; drop the oldest such calls.
+                while len(self._pending) > self.max_entries:
+                    self._pending.pop(next(iter(self._pending)))
+                hit = False
+
+        self._export(tool.name, hit, entry[1] if hit else 0.0)
+        if hit:
+            stats = self.stats()
+            logger.info(
+                f"Tool cache hit for '{tool.name}', saved {entry[1] * 1000:.0f}ms "
+                f"(hit rate {stats['hit_rate']:.0%}, {stats['saved_seconds']:.1f}s saved in total)"
+            )
+            return entry[2]
+        return None
+
+    def after_tool_callback(
+        self,
+        tool: BaseTool,
+        args: dict[str, Any],
+        tool_context: ToolContext,
+        tool_response: Any,
+    ) -> Optional[dict]:
+        with self._lock:
+            pending = self._pending.pop(tool_context.function_call_id, None)
+        # Results answered from the cache have nothing pending.
+        if pending is None or not isinstance(tool_response, dict) or self._is_error(tool_response):
+            return None
+
+        key, ttl, started_at = pending
+        latency = time.perf_counter() - started_at
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, latency, tool_response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+    def _key(self, tool_name: str, policy: CachePolicy, args: dict[str, Any], tool_context: ToolContext) -> Hashable:
+        normalized = _map_strings(args, str.strip)
+        if policy.normalize:
+            normalized = policy.normalize(normalized)
+        principal = tool_context.user_id if policy.user_scoped else None
+        return tool_name, principal, json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+
+    @staticmethod
+    def _is_error(tool_response: dict) -> bool:
+        return bool(tool_response.get("isError") or tool_response.get("is_error") or "error" in tool_response)
+
+    def _export(self, tool_name: str, hit: bool, saved_seconds: float):
+        # Recorded on the tool call's trace span, alongside ADK's own tool call telemetry.
+        span = trace.get_current_span()
+        span.set_attribute("tool_cache.tool", tool_name)
+        span.set_attribute("tool_cache.hit", hit)
+        span.set_attribute("tool_cache.saved_ms", saved_seconds * 1000)
+        span.set_attribute("tool_cache.hit_rate", self.hits / (self.hits + self.misses))
@@ -0,0 +1,87 @@
+import time
+import logging
+from typing import Any, List, Optional
+
+import httpx
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
+
+logger = logging.getLogger(__name__)
+
+# Response header in which the scenario 1 MCP server advertises a hash of its tool definitions (see
+# scenario_1/1_cloud_run/src/http_middleware.py).
+TOOLS_VERSION_HEADER = "mcp-tools-version"
+
+
+class CachedMcpToolset(McpToolset):
+    """
+    An McpToolset that lists the server's tools once and reuses the list on later agent turns instead of calling
+    tools/list every time.
+
+    Every response from the server carries the version of its tool definitions in the TOOLS_VERSION_HEADER. When a
+    response advertises a version other than the one the cached list was fetched under, the list is fetched again on
+    the next turn. `ttl` bounds how long a list is reused for a server that doesn't advertise a version.
+    """
+    def __init__(self, *, connection_params: StreamableHTTPConnectionParams, ttl: float = 3600, **kwargs: Any):
+        self._http_client_factory = connection_params.httpx_client_factory
+        connection_params = connection_params.model_copy(update={"httpx_client_factory": self._create_http_client})
+        super().__init__(connection_params=connection_params, **kwargs)
+        self.ttl = ttl
+        self._tools: Optional[List[BaseTool]] = None
+        self._listed_at = 0.0
+        self._listed_version: Optional[str] = None
+        self._server_version: Optional[str] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        # A callable tool filter can select tools per context, so only the full or name-filtered list is reused.
+        if self._tools is not None and not callable(self.tool_filter) and self._is_fresh():
+            self.hits += 1
+            return list(self._tools)
+
+        self.misses += 1
+        tools = await super().get_tools(readonly_context)
+        # The tools/list response itself carried the current version.
+        self._tools = tools
+        self._listed_at = time.monotonic()
+        self._listed_version = self._server_version
+        logger.info(f"Listed {len(tools)} tools from the MCP server (tools version: {self._listed_version})")
+        return list(tools)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "tools_version": self._listed_version,
+        }
+
+    def _is_fresh(self) -> bool:
+        if time.monotonic() - self._listed_at >= self.ttl:
+            return False
+        if self._server_version != self._listed_version:
+            self.invalidations += 1
+            logger.info(f"MCP server tools changed ({self._listed_version} -> {self._server_version}), listing again")
+            self._tools = None
+            return False
+        return True
+
+    def _create_http_client(
+        self,
+        headers: Optional[dict[str, str]] = None,
+        timeout: Optional[httpx.Timeout] = None,
+        auth: Optional[httpx.Auth] = None,
+    ) -> httpx.AsyncClient:
+        client = self._http_client_factory(headers=headers, timeout=timeout, auth=auth)
+        client.event_hooks["response"].append(self._observe_version)
+        return client
+
+    async def _observe_version(self, response: httpx.Response):
+        version = response.headers.get(TOOLS_VERSION_HEADER)
+        if version is not None:
+            self._server_version = version
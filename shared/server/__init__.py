@@ -0,0 +1,6 @@
+"""
+Modules shared by the scenario 1 and scenario 2 MCP servers.
+
+Each server's `src` folder links this package in as `shared`, so the server and its tests import it as `shared.<module>`.
+The container images copy it next to the server's code.
+"""
@@ -0,0 +1,102 @@
+import os
+import math
+import logging
+
+import uvicorn
+from starlette.types import ASGIApp
+
+logger = logging.getLogger(__name__)
+
+# The server's exported ASGI app, as "module:attribute".
+APP = "main:app"
+
+# Seconds in-flight requests are given to finish once the server is asked to stop. Cloud Run sends SIGTERM and kills
+# the container 10 seconds later.
+SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", 8))
+
+# Streamable HTTP options. In stateless mode `initialize` creates no session: every request is self-contained and can be
+# answered by any worker or instance, and the server keeps no per-session state. With JSON responses, a request's
+# result is returned as a single application/json body instead of an SSE stream.
+MCP_STATELESS_HTTP = os.getenv("MCP_STATELESS_HTTP", "false").lower() == "true"
+MCP_JSON_RESPONSE = os.getenv("MCP_JSON_RESPONSE", "false").lower() == "true"
+
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs the server may use: the container's CPU limit (cgroup v2 `cpu.max`, as set by Cloud Run),
+    rounded up, or else the number of CPUs the process may run on.
+    """
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+
+    if hasattr(os, "process_cpu_count"):
+        return os.process_cpu_count() or 1
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def worker_count() -> int:
+    """
+    Returns the number of worker processes to run: WORKERS, which defaults to 1, or one per available CPU if it is
+    "auto".
+    """
+    workers = os.getenv("WORKERS", "1")
+    return max(1, available_cpus() if workers == "auto" else int(workers))
+
+
+def stateless_http() -> bool:
+    """
+    Returns whether to serve MCP requests statelessly (MCP_STATELESS_HTTP).
+    """
+    return MCP_STATELESS_HTTP
+
+
+def serve(app: ASGIApp | str, port: int, workers: int | None = None):
+    """
+    Runs the ASGI app with uvicorn on `port` in `workers` processes (worker_count() by default).
+
+    A single worker serves `app` in this process. With more, `app` must be given as "module:attribute": each worker
+    process imports the module and builds its own app, and uvicorn's supervisor shares the listening socket between
+    them, replaces workers that die and, on SIGTERM or SIGINT, stops them gracefully, giving in-flight requests
+    SHUTDOWN_TIMEOUT_SECONDS to finish.
+
+    Workers share nothing but the socket. MCP sessions only exist in the worker that created them, so several workers
+    require MCP_STATELESS_HTTP=true. Caches, rate limits, circuit breakers and in-flight call deduplication are kept per
+    worker: a per-user limit of N calls allows up to N calls per worker, and each worker warms its own caches.
+    """
+    workers = workers or worker_count()
+    if workers > 1 and not isinstance(app, str):
+        raise ValueError("Running several workers requires the app as a 'module:attribute' import string")
+    if workers > 1 and not stateless_http():
+        raise ValueError(
+            "Running several workers requires MCP_STATELESS_HTTP=true: a session would only exist in the worker that "
+            "created it"
+        )
+
+    logger.info(
+        f"Serving on port {port} with {workers} worker process(es), "
+        f"stateless_http={stateless_http()}, json_response={MCP_JSON_RESPONSE}"
+    )
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        workers=workers,
+        lifespan="on",
+        timeout_graceful_shutdown=SHUTDOWN_TIMEOUT_SECONDS,
+    )
+
+
+# The container entrypoint, run from the server's directory as `python -m shared.serve`. Unlike `python main.py`, it
+# doesn't build the app in the supervisor process when running several workers.
+if __name__ == "__main__":
+    logging.basicConfig(format="[%(levelname)s]: %(message)s", level=logging.INFO)
+    port = int(os.getenv("PORT", 8080))
+    logger.info(f"🚀 MCP server started on port {port}")
+    serve(APP, port)